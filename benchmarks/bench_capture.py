@@ -0,0 +1,59 @@
+# Compares the "line" and "bulk" capture modes of CiscoRunner.get_command_output() on a large fake
+# 'show running-config'. Run from the project's root directory: python benchmarks/bench_capture.py
+
+import os
+import sys
+import time
+import logging
+
+script_dir, script_name = os.path.split(os.path.realpath(__file__))
+sys.path.append(os.path.dirname(script_dir))
+sys.path.append(script_dir)
+
+from fake_crt import FakeScreen, FakeCrt
+from runners.cisco.nxos_runner import NXOS
+
+# Every call into SecureCRT crosses a process boundary, this is a rough guess of what one costs.
+API_CALL_SECONDS = 0.0005
+
+
+def make_config(line_count):
+    lines = []
+    while len(lines) < line_count:
+        number = len(lines)
+        lines += ["interface Ethernet1/{}".format(number),
+                  "  description bench port {}".format(number),
+                  "  switchport access vlan {}".format(number % 4000 + 1),
+                  "  no shutdown"]
+    return lines[:line_count]
+
+
+def run(capture_mode, config, page_length):
+    screen = FakeScreen("nexus", {"show running-config": config}, page_length)
+    crt = FakeCrt([screen])
+    runner = NXOS(crt, crt.GetScriptTab())
+    runner.capture_mode = capture_mode
+    screen.api_calls = 0
+    start = time.perf_counter()
+    output = runner.get_command_output("show running-config")
+    elapsed = time.perf_counter() - start
+    return output, elapsed, screen.api_calls
+
+
+def main():
+    logging.disable(logging.CRITICAL)
+    config = make_config(50000)
+    for page_length in (0, 24):
+        results = {}
+        for capture_mode in ("line", "bulk"):
+            output, elapsed, api_calls = run(capture_mode, config, page_length)
+            results[capture_mode] = output
+            print("{:>4} page length {:>2}: {:>6} lines, {:>6} API calls, {:7.3f}s python, "
+                  "~{:7.2f}s with {}ms per API call".format(capture_mode, page_length, len(output), api_calls,
+                                                             elapsed, elapsed + api_calls * API_CALL_SECONDS,
+                                                             API_CALL_SECONDS * 1000))
+        print("Same output: {}".format(results["line"] == results["bulk"]))
+
+
+if __name__ == '__main__':
+    main()
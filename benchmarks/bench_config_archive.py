@@ -0,0 +1,79 @@
+# Archives many backups of a large generated configuration where only a few lines change between runs, and compares
+# the archive's size with keeping every backup, plus the time to add a version and rebuild any of them.
+# Run from the project's root directory: python benchmarks/bench_config_archive.py
+# Pass the line count and number of backups to try other sizes: python benchmarks/bench_config_archive.py 50000 200
+
+import os
+import sys
+import time
+import random
+import shutil
+import logging
+import tempfile
+
+script_dir, script_name = os.path.split(os.path.realpath(__file__))
+sys.path.append(os.path.dirname(script_dir))
+
+from crt_automation.config_archive import ConfigArchive, normalize_config
+
+
+def make_config(line_count):
+    lines = ["Building configuration...", "", "Current configuration : 123456 bytes", "!",
+             "! Last configuration change at 10:00:00 UTC Mon Jan 1 2024", "!", "hostname bench", "!"]
+    number = 0
+    while len(lines) < line_count:
+        lines += ["interface GigabitEthernet{}/0/{}".format(number // 48 + 1, number % 48 + 1),
+                  " description bench port {}".format(number),
+                  " switchport access vlan {}".format(number % 4000 + 1),
+                  "!"]
+        number += 1
+    return lines + ["end"]
+
+
+def folder_size(path):
+    return sum(os.path.getsize(os.path.join(folder, name)) for folder, folders, names in os.walk(path)
+               for name in names)
+
+
+def main():
+    logging.disable(logging.CRITICAL)
+    line_count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    runs = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    random.seed(1)
+    root = tempfile.mkdtemp()
+    try:
+        archive = ConfigArchive(root)
+        config = make_config(line_count)
+        full_size = 0
+        add_seconds = 0
+        versions = []
+        for run in range(runs):
+            # The timestamp changes every run, and every other run a few descriptions change too
+            config[4] = "! Last configuration change at 10:{:02}:00 UTC Mon Jan 1 2024".format(run % 60)
+            if run % 2:
+                for change in range(3):
+                    line = random.randrange(9, len(config) - 1, 4)
+                    config[line] = " description changed in run {}".format(run)
+            full_size += len("\n".join(config))
+            start = time.perf_counter()
+            version, new = archive.add("bench", config)
+            add_seconds += time.perf_counter() - start
+            versions.append((version, list(normalize_config(config))))
+
+        # A new archive object, so versions are rebuilt from disk
+        archive = ConfigArchive(root)
+        start = time.perf_counter()
+        same = all(archive.get("bench", version) == lines for version, lines in versions)
+        rebuild_seconds = time.perf_counter() - start
+
+        print("{} backups of {} lines, {} unique versions:".format(runs, len(config), len(archive.versions("bench"))))
+        print("  every backup kept: {:8.3f} MB".format(full_size / 1e6))
+        print("  archive:           {:8.3f} MB".format(folder_size(root) / 1e6))
+        print("  add:     {:7.3f}s per backup".format(add_seconds / runs))
+        print("  rebuild: {:7.3f}s for all versions, same lines: {}".format(rebuild_seconds, same))
+    finally:
+        shutil.rmtree(root)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+# Compares ConfigTree with CiscoConfParse on large generated NX-OS style configs: parse time, peak memory, and the
+# "interfaces without shutdown" query. Run from the project's root directory: python benchmarks/bench_config_model.py
+# Pass line counts to try other sizes: python benchmarks/bench_config_model.py 10000 100000
+
+import os
+import sys
+import gc
+import time
+import logging
+import tracemalloc
+
+script_dir, script_name = os.path.split(os.path.realpath(__file__))
+sys.path.append(os.path.dirname(script_dir))
+
+from ciscoconfparse import CiscoConfParse
+from crt_automation.config_model import ConfigTree
+
+
+def make_config(line_count):
+    lines = ["!Command: show running-config", "!Time: Mon Jan  1 00:00:00 2024", "", "version 9.3(8)",
+             "hostname nexus", "", "vrf context management", "  ip route 0.0.0.0/0 10.0.0.1", ""]
+    number = 0
+    while len(lines) < line_count:
+        lines += ["interface Ethernet{}/{}".format(number // 48 + 1, number % 48 + 1),
+                  "  description bench port {}".format(number),
+                  "  switchport access vlan {}".format(number % 4000 + 1),
+                  "  spanning-tree port type edge"]
+        if number % 3 == 0:
+            lines.append("  shutdown")
+        lines.append("")
+        number += 1
+    lines += ["line console", "  exec-timeout 0", "line vty", "  exec-timeout 30"]
+    return lines
+
+
+def measure(function):
+    # tracemalloc slows everything down, so memory is measured in a second, untimed run.
+    start = time.perf_counter()
+    result = function()
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    function()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def main():
+    logging.disable(logging.CRITICAL)
+    sizes = [int(size) for size in sys.argv[1:]] or [10000, 50000]
+    for size in sizes:
+        config = make_config(size)
+
+        parse, parse_seconds, parse_peak = measure(lambda: CiscoConfParse(config))
+        start = time.perf_counter()
+        parse_active = parse.find_objects_wo_child(r"^interface", r"shutdown")
+        parse_query = time.perf_counter() - start
+        del parse
+        gc.collect()
+
+        tree, tree_seconds, tree_peak = measure(lambda: ConfigTree(config))
+        start = time.perf_counter()
+        tree_active = tree.without_child("interface", "shutdown")
+        tree_query = time.perf_counter() - start
+
+        print("{} lines:".format(len(config)))
+        print("  CiscoConfParse: parse {:7.3f}s, {:7.1f} MB peak, query {:7.4f}s".format(
+            parse_seconds, parse_peak / 1e6, parse_query))
+        print("  ConfigTree:     parse {:7.3f}s, {:7.1f} MB peak, query {:7.4f}s".format(
+            tree_seconds, tree_peak / 1e6, tree_query))
+        print("  Same interfaces: {}".format([line.text for line in parse_active] ==
+                                              [line.text for line in tree_active]))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+# Indexes many generated device configurations with ConfigIndex and compares its searches with scanning every
+# configuration, for a substring and a regular expression. Run from the project's root directory:
+# python benchmarks/bench_config_search.py
+# Pass the number of devices and lines per configuration to try other sizes: python benchmarks/bench_config_search.py 5000 2000
+
+import os
+import re
+import sys
+import time
+import random
+import shutil
+import logging
+import tempfile
+
+script_dir, script_name = os.path.split(os.path.realpath(__file__))
+sys.path.append(os.path.dirname(script_dir))
+
+from crt_automation.config_search import ConfigIndex
+
+
+def make_config(device, line_count):
+    lines = ["hostname sw{}".format(device), "!"]
+    number = 0
+    while len(lines) < line_count:
+        lines += ["interface Vlan{}".format(number + 10),
+                  " description users {} of sw{}".format(number, device),
+                  " ip address 10.{}.{}.1 255.255.255.0".format(device % 250, number % 250),
+                  " ip helper-address 10.1.{}.{}".format(random.randrange(4), random.randrange(1, 255)),
+                  "!"]
+        number += 1
+    return lines
+
+
+def main():
+    logging.disable(logging.CRITICAL)
+    devices = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    line_count = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+    random.seed(1)
+    folder = tempfile.mkdtemp()
+    try:
+        index = ConfigIndex(os.path.join(folder, "search_index.sqlite"))
+        configs = {}
+        start = time.perf_counter()
+        for device in range(devices):
+            configs["sw{}".format(device)] = make_config(device, line_count)
+            index.add("sw{}".format(device), configs["sw{}".format(device)])
+        index_seconds = time.perf_counter() - start
+        print("{} devices, {} lines each, index {:.1f} MB, {:.2f}ms per added configuration".format(
+            devices, line_count, os.path.getsize(index.path) / 1e6, index_seconds * 1000 / devices))
+
+        # A rare line, a common line, and a regular expression. The full scan reads configurations that are already
+        # in memory, so it is faster than scanning files would be.
+        queries = [("rare", "ip address 10.7.3.1 ", None),
+                   ("common", "ip helper-address 10.1.3.254", None),
+                   ("regex", None, r"ip address 10\.7\.\d+\.1 ")]
+        for name, text, regex in queries:
+            start = time.perf_counter()
+            results = index.search(text, regex)
+            index_seconds = time.perf_counter() - start
+            compiled = re.compile(regex) if regex else None
+            start = time.perf_counter()
+            scanned = [(device, number) for device, lines in configs.items() for number, line in enumerate(lines, 1)
+                       if (compiled.search(line) if compiled else text in line)]
+            scan_seconds = time.perf_counter() - start
+            print("  {:6}: index {:7.3f}s, full scan {:7.3f}s, {} lines, same results: {}".format(
+                name, index_seconds, scan_seconds, len(results),
+                sorted(scanned) == sorted((result[0], result[3]) for result in results)))
+        index.close()
+    finally:
+        shutil.rmtree(folder)
+
+
+if __name__ == '__main__':
+    main()
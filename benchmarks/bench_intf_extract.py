@@ -0,0 +1,63 @@
+# Compares utilities.intf_regex() with InterfaceExtractor on a large generated "show interfaces" output, as one
+# string and as a stream of lines. Run from the project's root directory: python benchmarks/bench_intf_extract.py
+# Pass the number of interfaces to try other sizes: python benchmarks/bench_intf_extract.py 20000
+
+import os
+import sys
+import time
+
+script_dir, script_name = os.path.split(os.path.realpath(__file__))
+sys.path.append(os.path.dirname(script_dir))
+
+from crt_automation import utilities
+from crt_automation.interfaces import InterfaceExtractor
+
+INTERFACE_TEMPLATE = """GigabitEthernet{slot}/0/{port} is up, line protocol is up (connected)
+  Hardware is Gigabit Ethernet, address is 0011.22{slot:02d}.{port:04d} (bia 0011.22{slot:02d}.{port:04d})
+  Description: uplink to Gi{slot}/0/{port} on core-{slot}
+  Internet address is 10.{slot}.{port}.1/24
+  MTU 1500 bytes, BW 1000000 Kbit/sec, DLY 10 usec,
+     reliability 255/255, txload 1/255, rxload 1/255
+  Encapsulation ARPA, loopback not set
+  Keepalive set (10 sec)
+  Full-duplex, 1000Mb/s, media type is 10/100/1000BaseTX
+  Last input 00:00:01, output 00:00:00, output hang never
+  Members in this channel: Gi{slot}/0/{port} Po{slot}
+  5 minute input rate 1000 bits/sec, 2 packets/sec
+     123456 packets input, 98765432 bytes, 0 no buffer
+"""
+
+
+def make_output(interface_count):
+    return "".join(INTERFACE_TEMPLATE.format(slot=number // 48 + 1, port=number % 48 + 1)
+                   for number in range(interface_count))
+
+
+def timed(function):
+    start = time.perf_counter()
+    result = function()
+    return result, time.perf_counter() - start
+
+
+def main():
+    interface_count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    output = make_output(interface_count)
+    lines = output.splitlines()
+    print("{} interfaces, {:.1f} MB of output".format(interface_count, len(output) / 1e6))
+
+    matches, seconds = timed(lambda: utilities.intf_regex(output))
+    # Pieces of IP addresses, MAC addresses and counters, like "10" or "0011"
+    not_names = [match for match in set(matches) if not match[0].isalpha()]
+    print("  intf_regex:               {:7.3f}s, {:>7} matches, {:>7} unique, {} of them not interfaces".format(
+        seconds, len(matches), len(set(matches)), len(not_names)))
+
+    extractor = InterfaceExtractor()
+    found, seconds = timed(lambda: extractor.extract(output))
+    print("  InterfaceExtractor text:  {:7.3f}s, {:>7} unique names".format(seconds, len(found)))
+    found_lines, seconds = timed(lambda: extractor.extract(iter(lines)))
+    print("  InterfaceExtractor lines: {:7.3f}s, {:>7} unique names, same result: {}".format(
+        seconds, len(found_lines), found == found_lines))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+# Serves a large generated configuration from the built-in TFTP server and downloads it over the loopback interface,
+# the way a device runs "copy tftp://... running-config", and compares that with typing the same lines at console
+# speed. Run from the project's root directory: python benchmarks/bench_tftp_upload.py
+# Pass line counts to try other sizes: python benchmarks/bench_tftp_upload.py 5000 50000
+
+import os
+import sys
+import time
+import logging
+
+script_dir, script_name = os.path.split(os.path.realpath(__file__))
+sys.path.append(os.path.dirname(script_dir))
+
+from crt_automation.file_server import TftpServer, tftp_get
+
+# A 9600 baud console moves about 960 characters a second, and every line is echoed back
+console_characters_per_second = 960
+
+
+def make_config(line_count):
+    lines = ["hostname bench"]
+    number = 0
+    while len(lines) < line_count:
+        lines += ["interface GigabitEthernet{}/0/{}".format(number // 48 + 1, number % 48 + 1),
+                  " description bench port {}".format(number),
+                  " switchport access vlan {}".format(number % 4000 + 1),
+                  " no shutdown"]
+        number += 1
+    return "\n".join(lines) + "\n"
+
+
+def main():
+    logging.disable(logging.CRITICAL)
+    sizes = [int(size) for size in sys.argv[1:]] or [5000, 50000]
+    server = TftpServer(host="127.0.0.1", port=0)
+    server.start()
+    try:
+        for size in sizes:
+            config = make_config(size)
+            server.add_file("bench.cfg", config)
+            print("{} lines, {} bytes:".format(size, len(config)))
+            print("  typed on a console: {:8.1f}s (estimated)".format(len(config) / console_characters_per_second))
+            for block_size in (None, 1468, 8192):
+                start = time.perf_counter()
+                data = tftp_get("127.0.0.1", "bench.cfg", server.port, block_size)
+                elapsed = time.perf_counter() - start
+                print("  TFTP, {:>5} byte blocks: {:8.3f}s, same file: {}".format(block_size or 512, elapsed,
+                                                                               data == config.encode()))
+    finally:
+        server.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,146 @@
+# Minimal stand-in for the SecureCRT "crt" object, used by the benchmarks in this folder.
+# It plays back canned command output with an optional --More-- pager, and counts the calls made into the API.
+
+import re
+
+
+class FakeScreen:
+    def __init__(self, hostname="Router", outputs=None, page_length=0, pager="--More--"):
+        self.hostname = hostname
+        self.outputs = outputs or {}
+        self.page_length = page_length
+        self.pager = pager
+        self.mode = ""
+        self.buffer = ""
+        self.position = 0
+        self.typed = ""
+        self.paged_lines = []
+        self.MatchIndex = 0
+        self.Synchronous = True
+        self.IgnoreEscape = False
+        self.CurrentRow = 1
+        self.api_calls = 0
+
+    def prompt(self):
+        return self.hostname + self.mode + "#"
+
+    def _print_lines(self, lines):
+        if self.page_length and len(lines) > self.page_length:
+            self.paged_lines = lines[self.page_length:]
+            lines = lines[:self.page_length]
+            self.buffer += "".join(line + "\r\n" for line in lines) + " " + self.pager + " "
+            return
+        self.buffer += "".join(line + "\r\n" for line in lines) + self.prompt()
+
+    def _run(self, command):
+        command = command.strip()
+        if re.match(r"conf", command):
+            self.mode = "(config)"
+        elif re.match(r"int", command) and self.mode:
+            self.mode = "(config-if)"
+        elif command == "end" or (command == "exit" and self.mode == "(config)"):
+            self.mode = ""
+        elif command == "exit" and self.mode:
+            self.mode = "(config)"
+        return self.outputs.get(command, [])
+
+    def Send(self, string):
+        self.api_calls += 1
+        for character in string:
+            if self.paged_lines:
+                if character == " ":
+                    lines, self.paged_lines = self.paged_lines, []
+                    self.buffer += "\b" * 10 + " " * 10 + "\b" * 10
+                    self._print_lines(lines)
+            elif character in "\r\n":
+                self.buffer += "\r\n"
+                command, self.typed = self.typed, ""
+                self._print_lines(self._run(command))
+            else:
+                self.typed = self.typed[:-1] if character == "\b" else self.typed + character
+                self.buffer += character
+
+    def _find(self, strings):
+        pattern = "|".join("({})".format(re.escape(string)) for string in strings)
+        match = re.compile(pattern).search(self.buffer, self.position)
+        if match is None:
+            return None
+        return match.start(), match.lastindex, match.group()
+
+    def ReadString(self, strings, timeout=0, milliseconds=False):
+        self.api_calls += 1
+        if isinstance(strings, str):
+            strings = [strings]
+        found = self._find(strings)
+        if found is None:
+            # Like SecureCRT, a timeout returns whatever output arrived in the meantime
+            self.MatchIndex = 0
+            result = self.buffer[self.position:]
+            self.position = len(self.buffer)
+            return result
+        position, self.MatchIndex, string = found
+        result = self.buffer[self.position:position]
+        self.position = position + len(string)
+        return result
+
+    def WaitForStrings(self, strings, timeout=0):
+        self.api_calls += 1
+        found = self._find(strings)
+        if found is None:
+            return 0
+        self.position = found[0] + len(found[2])
+        return found[1]
+
+    def WaitForString(self, string, timeout=0):
+        return self.WaitForStrings([string], timeout) == 1
+
+    def Get(self, row1, col1, row2, col2):
+        self.api_calls += 1
+        return self.prompt()
+
+
+class FakeSession:
+    Connected = True
+
+    def Lock(self):
+        pass
+
+    def Unlock(self):
+        pass
+
+
+class FakeTab:
+    def __init__(self, screen, index=1):
+        self.Screen = screen
+        self.Session = FakeSession()
+        self.Caption = screen.hostname
+        self.Index = index
+
+    def Activate(self):
+        pass
+
+
+class FakeDialog:
+    def MessageBox(self, message):
+        print(message)
+
+    def Prompt(self, message):
+        return ""
+
+
+class FakeCrt:
+    def __init__(self, screens):
+        self.tabs = [FakeTab(screen, index + 1) for index, screen in enumerate(screens)]
+        self.Screen = screens[0]
+        self.Dialog = FakeDialog()
+        self.Synchronous = True
+        self.ScriptFullName = __file__
+
+    def GetScriptTab(self):
+        return self.tabs[0]
+
+    def GetTab(self, index):
+        return self.tabs[index - 1]
+
+    def GetTabCount(self):
+        return len(self.tabs)
@@ -149,6 +149,8 @@ class CiscoScripts:
             destination_dir = self.get_copy_directory(runner)
 
         self.runner.priv_exec()
+        # The copy dialog is driven with Screen.Send(), so cached output has to be cleared here.
+        self.runner.invalidate_output_cache()
 
         if vrf is None:
             self.runner.current_tab.Screen.Send("copy ftp://{}:{}@{} {} \r".format(username,
@@ -0,0 +1,273 @@
+# $language = "Python3"
+# $interface = "1.0"
+
+# Keeps every version of each device's configuration, stored once. Configurations are normalized so lines that change
+# on every run (timestamps, checksums) don't count as changes, and identified by the SHA-256 hash of what is left.
+# New versions are stored as line deltas against the version before them, so an archive grows with the amount of
+# change, not with the number of backups.
+
+import os
+import re
+import gzip
+import json
+import time
+import difflib
+import hashlib
+import logging
+import collections
+
+logger = logging.getLogger()
+
+default_archive_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.realpath(__file__))), "config_archive")
+
+# Lines that change without the configuration changing, like the time the output was made or the NTP drift.
+volatile_line_regex = re.compile(r"^\s*(!\s*Time:|!\s*Last configuration change|!\s*NVRAM config last updated|"
+                                 r"!\s*No configuration change|!\s*Running configuration last done|"
+                                 r"!\s*Startup config saved|!\s*Command: show|Building configuration|"
+                                 r"Current configuration\s*:|Cryptochecksum:|:\s*Saved|:\s*Written by|"
+                                 r"ntp clock-period|!!\s*Last commit)")
+
+
+def normalize_config(config):
+    """
+    Returns a configuration without its volatile lines, trailing whitespace and trailing blank lines, so two backups
+    of the same configuration are equal.
+    :param config: iterable of configuration lines, like CiscoRunner.iter_command_output(), or a multiline string
+    :return: list of lines
+    """
+    if isinstance(config, str):
+        config = config.splitlines()
+    lines = [line.rstrip() for line in config if not volatile_line_regex.match(line)]
+    while lines and not lines[-1]:
+        lines.pop()
+    return lines
+
+
+def config_hash(lines):
+    """
+    Returns the SHA-256 hash that identifies a normalized configuration.
+    """
+    return hashlib.sha256("\n".join(lines).encode("utf-8")).hexdigest()
+
+
+def make_delta(base, lines):
+    """
+    Describes lines as changes to base: ["=", start, end] copies base[start:end], and ["+", [...]] inserts lines.
+    :param base: list of lines of the previous version
+    :param lines: list of lines of the new version
+    :return: list of operations, see apply_delta()
+    """
+    operations = []
+    matcher = difflib.SequenceMatcher(None, base, lines)
+    for tag, base_start, base_end, start, end in matcher.get_opcodes():
+        if tag == "equal":
+            operations.append(["=", base_start, base_end])
+        elif tag in ("replace", "insert"):
+            operations.append(["+", lines[start:end]])
+    return operations
+
+
+def apply_delta(base, operations):
+    """
+    Rebuilds a version from the version it was stored against and its delta, see make_delta().
+    """
+    lines = []
+    for operation in operations:
+        if operation[0] == "=":
+            lines += base[operation[1]:operation[2]]
+        else:
+            lines += operation[1]
+    return lines
+
+
+class ConfigArchive:
+    """
+    An archive of configuration versions, with one folder per device:
+        <device>/index.json          the versions, in the order they were first seen, and when each was seen
+        <device>/<hash>.json.gz      one file per version: all its lines, or a delta against its base version
+    Every keyframe_interval versions, a version is stored whole, so rebuilding one never applies more than that many
+    deltas. Only the cache_size versions used last are kept in memory, so long runs over many devices don't grow.
+    Example:
+        archive = ConfigArchive()
+        version, new = archive.add("core-sw1", runner.get_command_output("show running-config"))
+        lines = archive.get("core-sw1", version)
+
+    :var self.root: the archive's folder
+    :var self.indexes: dictionary mapping device names to their loaded index
+    :var self.cache: OrderedDict mapping version hashes to their lines, least recently used first
+    :var self.search_index: a crt_automation.config_search.ConfigIndex that add() keeps up to date, or None
+    """
+
+    def __init__(self, root=None, keyframe_interval=20, search_index=None, cache_size=16):
+        if root is None:
+            root = default_archive_dir
+        self.root = root
+        self.keyframe_interval = keyframe_interval
+        self.search_index = search_index
+        self.cache_size = cache_size
+        self.indexes = {}
+        self.cache = collections.OrderedDict()
+
+    def cache_lines(self, version, lines):
+        """
+        Keeps a version's lines in self.cache, and forgets the least recently used versions past self.cache_size.
+        """
+        self.cache[version] = lines
+        self.cache.move_to_end(version)
+        while len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+
+    def cached_lines(self, version):
+        """
+        Returns a version's lines from self.cache, or None if they aren't in it.
+        """
+        lines = self.cache.get(version)
+        if lines is not None:
+            self.cache.move_to_end(version)
+        return lines
+
+    def device_dir(self, device):
+        # Device names come from prompts and session names, keep them usable as folder names
+        return os.path.join(self.root, re.sub(r"[^\w.-]", "_", device))
+
+    def load_index(self, device):
+        """
+        Returns a device's index: {"versions": {hash: {"base", "depth", "first_seen", "last_seen"}},
+        "history": [hashes in the order they became current], "markers": {name: change marker}}
+        """
+        if device in self.indexes:
+            return self.indexes[device]
+        path = os.path.join(self.device_dir(device), "index.json")
+        index = {"versions": {}, "history": [], "markers": {}}
+        if os.path.exists(path):
+            with open(path, "r") as index_file:
+                index.update(json.load(index_file))
+        self.indexes[device] = index
+        return index
+
+    def save_index(self, device):
+        path = os.path.join(self.device_dir(device), "index.json")
+        # Written to another file first, so an interrupted script can't leave half an index behind
+        with open(path + ".tmp", "w") as index_file:
+            json.dump(self.indexes[device], index_file, indent=1)
+        os.replace(path + ".tmp", path)
+
+    def add(self, device, config):
+        """
+        Archives a configuration, unless the same version is already archived.
+        :param device: the device's name, like its hostname
+        :param config: iterable of configuration lines, or a multiline string
+        :return: (version hash, True if the version is new) tuple
+        """
+        lines = normalize_config(config)
+        version = config_hash(lines)
+        index = self.load_index(device)
+        now = time.time()
+        new = version not in index["versions"]
+        if not new:
+            index["versions"][version]["last_seen"] = now
+        else:
+            os.makedirs(self.device_dir(device), exist_ok=True)
+            latest = index["history"][-1] if index["history"] else None
+            base = None
+            depth = 0
+            if latest is not None and index["versions"][latest]["depth"] + 1 < self.keyframe_interval:
+                base = latest
+                depth = index["versions"][latest]["depth"] + 1
+            if base is None:
+                content = {"lines": lines}
+            else:
+                content = {"base": base, "delta": make_delta(self.get(device, base), lines)}
+            with gzip.open(os.path.join(self.device_dir(device), version + ".json.gz"), "wt") as version_file:
+                json.dump(content, version_file)
+            index["versions"][version] = {"base": base, "depth": depth, "first_seen": now, "last_seen": now}
+            self.cache_lines(version, lines)
+            logger.info("<ConfigArchive.add> New version {} of {} ({} lines).".format(version[:12], device,
+                                                                                     len(lines)))
+        if not index["history"] or index["history"][-1] != version:
+            index["history"].append(version)
+        self.save_index(device)
+        if self.search_index is not None:
+            self.search_index.add(device, lines, version)
+        return version, new
+
+    def get(self, device, version=None):
+        """
+        Rebuilds a version of a device's configuration.
+        :param device: the device's name
+        :param version: the version's hash, or a unique prefix of it. By default, the latest version.
+        :return: list of normalized configuration lines
+        """
+        version = self.find_version(device, version)
+        lines = self.cached_lines(version)
+        if lines is not None:
+            return list(lines)
+        # Walk back to the nearest version stored whole or cached, then apply the deltas forward
+        chain = []
+        current = version
+        while current is not None and lines is None:
+            with gzip.open(os.path.join(self.device_dir(device), current + ".json.gz"), "rt") as version_file:
+                content = json.load(version_file)
+            chain.append((current, content))
+            current = content.get("base")
+            if current is not None:
+                lines = self.cached_lines(current)
+        for current, content in reversed(chain):
+            if "lines" in content:
+                lines = content["lines"]
+            else:
+                lines = apply_delta(lines, content["delta"])
+        # Only the version asked for is cached, the ones in between are rarely asked for again
+        self.cache_lines(version, lines)
+        return list(lines)
+
+    def find_version(self, device, version=None):
+        """
+        Returns the full hash of a version from a prefix of it, or of the latest version.
+        """
+        index = self.load_index(device)
+        if version is None:
+            if not index["history"]:
+                raise Exception("No archived configurations for {}".format(device))
+            return index["history"][-1]
+        matches = [known for known in index["versions"] if known.startswith(version)]
+        if len(matches) != 1:
+            raise Exception("{} archived versions of {} start with '{}'".format(len(matches), device, version))
+        return matches[0]
+
+    def versions(self, device):
+        """
+        Returns a device's versions, oldest first.
+        :return: list of (version hash, first seen, last seen) tuples, times in seconds since the epoch
+        """
+        index = self.load_index(device)
+        versions = [(version, info["first_seen"], info["last_seen"]) for version, info in index["versions"].items()]
+        versions.sort(key=lambda version: version[1])
+        return versions
+
+    def diff(self, device, old_version, new_version=None):
+        """
+        Returns the differences between two versions as unified diff lines.
+        :param device: the device's name
+        :param old_version: the older version's hash or a prefix of it
+        :param new_version: the newer version's hash or a prefix of it, by default the latest version
+        """
+        old_version = self.find_version(device, old_version)
+        new_version = self.find_version(device, new_version)
+        return list(difflib.unified_diff(self.get(device, old_version), self.get(device, new_version),
+                                         old_version[:12], new_version[:12], lineterm=""))
+
+    def get_marker(self, device, name):
+        """
+        Returns the change marker stored with set_marker() for a device's configuration, like "running".
+        """
+        return self.load_index(device)["markers"].get(name)
+
+    def set_marker(self, device, name, marker):
+        """
+        Stores the change marker of the configuration that was archived last, see CiscoRunner.get_change_marker().
+        """
+        index = self.load_index(device)
+        index["markers"][name] = marker
+        if os.path.isdir(self.device_dir(device)):
+            self.save_index(device)
@@ -0,0 +1,443 @@
+# $language = "Python3"
+# $interface = "1.0"
+
+# A lightweight, parse-once model of a Cisco configuration. It does a small part of what CiscoConfParse does, but is
+# built in one pass over the lines and indexes sections by type and name, so it stays fast on very large configs.
+
+import gc
+import re
+import logging
+
+logger = logging.getLogger()
+
+# Top-level lines that start a section, and the section type they are indexed under.
+# The "name" group is the name the section is indexed by, like "GigabitEthernet1/0/1" or "ospf 1".
+section_patterns = [
+    ("interface", re.compile(r"^interface\s+(?P<name>.+)$", re.IGNORECASE)),
+    ("router", re.compile(r"^router\s+(?P<name>.+)$", re.IGNORECASE)),
+    ("vrf", re.compile(r"^(ip\s+)?vrf\s+(definition\s+|context\s+)?(?P<name>\S+)$", re.IGNORECASE)),
+    ("line", re.compile(r"^line\s+(?P<name>.+)$", re.IGNORECASE)),
+    ("acl", re.compile(r"^(ip|ipv4|ipv6|mac)\s+access-list\s+(standard\s+|extended\s+|role-based\s+)?(?P<name>\S+)",
+                       re.IGNORECASE)),
+    # Numbered IOS and ASA access lists are top-level lines that share a name, like "access-list 101 permit ip any any"
+    ("acl", re.compile(r"^access-list\s+(?P<name>\S+)", re.IGNORECASE)),
+]
+
+# Lines that aren't part of the configuration itself
+ignored_line_regex = re.compile(r"^(!|Building configuration|Current configuration|Command: show|Time: )")
+
+# The first line of a banner, and the delimiter its text ends with. The running-config shows the delimiter as "^C".
+banner_regex = re.compile(r"^banner\s+\S+\s+(?P<delimiter>\^C|\S)(?P<text>.*)$", re.IGNORECASE)
+
+# Lines that set a state instead of adding something, which ConfigTree.get_delta() never removes. Negating them would
+# change the state, like "no shutdown" for a port that is meant to stay down, and "no X" can't be undone by sending a
+# bare "X", which is often incomplete, like "ip address".
+state_line_regex = re.compile(r"^(no\s|default\s|shutdown$|switchport$)", re.IGNORECASE)
+
+
+def normalize_line(line):
+    """
+    Collapses whitespace, so child lines can be looked up no matter how they were indented or spaced.
+    :param line: a configuration line
+    :return: the line with single spaces and no leading or trailing whitespace
+    """
+    return " ".join(line.split())
+
+
+def negate_line(line):
+    """
+    Returns the command that removes a configuration line, like "no description" for "description uplink" and
+    "ip redirects" for "no ip redirects". For "no" lines this only works if the rest is a complete command, see
+    state_line_regex.
+    """
+    if line.startswith("no "):
+        return line[3:]
+    return "no " + line
+
+
+class ConfigLine:
+    """
+    One line of configuration and the lines indented below it.
+
+    :var self.text: the line without indentation, like "switchport mode access"
+    :var self.indent: the number of spaces the line was indented with
+    :var self.line_number: the line's position in the configuration, counting from 1
+    :var self.parent: the ConfigLine this line is indented under, or None for top-level lines
+    :var self.children: list of ConfigLine objects directly below this one
+    """
+    # Large configs have hundreds of thousands of lines, so don't give every one of them a __dict__.
+    __slots__ = ("text", "indent", "line_number", "parent", "children")
+
+    def __init__(self, text, indent=0, line_number=0, parent=None):
+        self.text = text
+        self.indent = indent
+        self.line_number = line_number
+        self.parent = parent
+        self.children = []
+
+    def __repr__(self):
+        return "<ConfigLine {}: '{}'>".format(self.line_number, self.text)
+
+    def has_child(self, child):
+        """
+        :param child: the text of a child line, like "shutdown"
+        :return: True if one of this line's direct children is child
+        """
+        child = normalize_line(child)
+        for line in self.children:
+            if line.text == child:
+                return True
+        return False
+
+    def lines(self):
+        """
+        Returns this line and every line below it as text, indented like they were in the configuration.
+        """
+        # Banners are one line with newlines in it
+        result = (" " * self.indent + self.text).split("\n")
+        for child in self.children:
+            result += child.lines()
+        return result
+
+
+class ConfigTree:
+    """
+    A configuration parsed into a tree of ConfigLine objects by indentation.
+    Top-level sections are indexed by type ("interface", "router", "vrf", "line" and "acl", see section_patterns)
+    and name. Each section type also has an index from child line to the sections that have it, so queries like
+    "interfaces with 'shutdown'" only touch the matching sections.
+
+    :var self.lines: list of top-level ConfigLine objects, in configuration order
+    :var self.sections: dictionary mapping section type to a dictionary of name -> list of ConfigLine objects
+    :var self.child_index: dictionary mapping section type to a dictionary of child text -> list of ConfigLine objects
+    """
+
+    def __init__(self, config=None):
+        self.lines = []
+        self.sections = {}
+        self.child_index = {}
+        self.line_count = 0
+        if config:
+            self.add_lines(config)
+
+    def __len__(self):
+        return self.line_count
+
+    def add_lines(self, config):
+        """
+        Parses configuration lines into the tree. Can be called again to add more configuration.
+        :param config: list of configuration lines, or a multiline string
+        """
+        if isinstance(config, str):
+            config = config.splitlines()
+        # Parents and children point at each other, so the garbage collector would keep rescanning the new lines
+        # while they are created. None of them are garbage, so it is paused until the tree is built.
+        gc_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            self.parse_lines(config)
+        finally:
+            if gc_enabled:
+                gc.enable()
+        logger.debug("<ConfigTree.add_lines> {} lines, {} top-level.".format(self.line_count, len(self.lines)))
+
+    def parse_lines(self, config):
+        stack = []
+        section_type = None
+        banner = None
+        for raw_line in config:
+            if banner is not None:
+                # Every line up to the delimiter belongs to the banner, as it is
+                banner_lines, delimiter = banner
+                banner_lines.append(raw_line.rstrip("\r\n"))
+                if delimiter in raw_line:
+                    stack[-1].text = "\n".join(banner_lines)
+                    banner = None
+                continue
+            text = raw_line.lstrip()
+            indent = len(raw_line) - len(text)
+            text = text.rstrip()
+            if not text or ignored_line_regex.match(text):
+                continue
+            if "  " in text or "\t" in text:
+                text = normalize_line(text)
+            self.line_count += 1
+            while stack and stack[-1].indent >= indent:
+                stack.pop()
+            if stack:
+                line = ConfigLine(text, indent, self.line_count, stack[-1])
+                stack[-1].children.append(line)
+                if len(stack) == 1 and section_type is not None:
+                    self.index_child(section_type, stack[0], line)
+            else:
+                line = ConfigLine(text, indent, self.line_count)
+                self.lines.append(line)
+                section_type = self.index_section(line)
+                match = banner_regex.match(text)
+                if match and match.group("delimiter") not in match.group("text"):
+                    # A banner is one line of configuration whose text has newlines, so it is compared and sent whole
+                    banner = ([text], match.group("delimiter"))
+            stack.append(line)
+
+    def index_section(self, line):
+        """
+        Adds a top-level line to self.sections.
+        :return: the section type line was indexed under, or None
+        """
+        for section_type, regex in section_patterns:
+            match = regex.match(line.text)
+            if match:
+                self.sections.setdefault(section_type, {}).setdefault(match.group("name"), []).append(line)
+                return section_type
+        return None
+
+    def index_child(self, section_type, section, child):
+        parents = self.child_index.setdefault(section_type, {}).setdefault(child.text, [])
+        # A section can repeat a child line, but should only be listed once.
+        if not parents or parents[-1] is not section:
+            parents.append(section)
+
+    def get_section_type(self, line):
+        """
+        :param line: a top-level ConfigLine
+        :return: the section type line is indexed under, or None
+        """
+        for section_type, regex in section_patterns:
+            if regex.match(line.text):
+                return section_type
+        return None
+
+    def get_sections(self, section_type, name=None):
+        """
+        Returns the top-level lines of every section of one type, in configuration order.
+        :param section_type: "interface", "router", "vrf", "line" or "acl"
+        :param name: only return sections with this name, like "Vlan10". Numbered ACLs can have many lines.
+        :return: list of ConfigLine objects
+        """
+        sections = self.sections.get(section_type, {})
+        if name is not None:
+            return list(sections.get(name, []))
+        result = []
+        for lines in sections.values():
+            result += lines
+        result.sort(key=lambda line: line.line_number)
+        return result
+
+    def get_section(self, section_type, name):
+        """
+        :return: the first ConfigLine of a section, or None if the configuration doesn't have it
+        """
+        sections = self.sections.get(section_type, {}).get(name)
+        if sections:
+            return sections[0]
+        return None
+
+    def get_names(self, section_type):
+        """
+        Returns the names of every section of one type, like all interface names.
+        """
+        return list(self.sections.get(section_type, {}).keys())
+
+    def with_child(self, section_type, child):
+        """
+        Returns the sections of one type that have a child line, like every interface with "shutdown".
+        :param section_type: "interface", "router", "vrf", "line" or "acl"
+        :param child: the child line, compared after collapsing whitespace
+        :return: list of ConfigLine objects
+        """
+        return list(self.child_index.get(section_type, {}).get(normalize_line(child), []))
+
+    def without_child(self, section_type, child):
+        """
+        Returns the sections of one type that don't have a child line, like every interface without "shutdown".
+        :param section_type: "interface", "router", "vrf", "line" or "acl"
+        :param child: the child line, compared after collapsing whitespace
+        :return: list of ConfigLine objects
+        """
+        excluded = set(id(line) for line in self.with_child(section_type, child))
+        return [line for line in self.get_sections(section_type) if id(line) not in excluded]
+
+    def find_children(self, section_type, regex):
+        """
+        Searches the child lines of every section of one type with a regular expression.
+        :param section_type: "interface", "router", "vrf", "line" or "acl"
+        :param regex: the regular expression to search child lines with
+        :return: list of (section, child) ConfigLine tuples
+        """
+        regex = re.compile(regex)
+        results = []
+        for child_text, sections in self.child_index.get(section_type, {}).items():
+            if regex.search(child_text):
+                for section in sections:
+                    for child in section.children:
+                        if child.text == child_text:
+                            results.append((section, child))
+        results.sort(key=lambda result: result[1].line_number)
+        return results
+
+    def remove_section(self, section_type, name):
+        """
+        Removes every line of a section from the tree and its indexes.
+        :param section_type: "interface", "router", "vrf", "line" or "acl"
+        :param name: the section's name
+        :return: the removed top-level ConfigLine objects
+        """
+        removed = self.sections.get(section_type, {}).pop(name, [])
+        if not removed:
+            return removed
+        removed_ids = set(id(line) for line in removed)
+        self.lines = [line for line in self.lines if id(line) not in removed_ids]
+        child_index = self.child_index.get(section_type, {})
+        for section in removed:
+            for child in section.children:
+                parents = child_index.get(child.text)
+                if parents and section in parents:
+                    parents.remove(section)
+                    if not parents:
+                        del child_index[child.text]
+        return removed
+
+    def get_delta(self, candidate, remove=False):
+        """
+        Compares a candidate configuration with this one (the running-config) and returns only what has to be sent
+        to turn one into the other. Top-level lines and child lines that are already configured are skipped.
+        With remove, child lines that only the running-config has are removed with "no" inside the sections both
+        have, except for lines that set a state, like "shutdown" or "no ip address" (see state_line_regex).
+        Top-level lines that only the running-config has are kept, because candidates are usually fragments.
+        Order isn't compared, so entries of ordered sections like ACLs are only added or removed, not moved.
+        Banners are compared and sent whole.
+        :param candidate: ConfigTree of the configuration to push
+        :param remove: also remove the child lines the candidate doesn't have
+        :return: ConfigDelta
+        """
+        delta = ConfigDelta()
+        running_lines = {}
+        for line in self.lines:
+            running_lines.setdefault(line.text, line)
+        for line in candidate.lines:
+            if line.text == "end":
+                continue
+            self.compare_line(running_lines.get(line.text), line, delta, 0, remove)
+        logger.debug("<ConfigTree.get_delta> {} lines added, {} removed, {} skipped.".format(
+            delta.added, delta.removed, delta.skipped))
+        return delta
+
+    def compare_line(self, running, candidate, delta, depth, remove=False):
+        """
+        Adds the commands that turn one running-config line and its children into the candidate line to delta.
+        :param running: the ConfigLine with the same text in the running-config, or None
+        :param candidate: the ConfigLine from the candidate configuration
+        :param delta: the ConfigDelta to add commands to
+        :param depth: how many parent sections candidate is in
+        :param remove: also remove the running-config's children that the candidate doesn't have
+        """
+        if running is None and "\n" in candidate.text:
+            # A new or changed banner replaces the old one, and isn't a section to leave with "exit"
+            delta.lines += candidate.text.split("\n")
+            delta.added += 1
+            return
+        if running is None:
+            # Not configured at all, so send it with everything below it
+            lines = self.indented_lines(candidate, depth)
+            delta.add_block(lines, len(lines), depth)
+            return
+        if not candidate.children:
+            delta.skipped += 1
+            return
+
+        running_children = {}
+        for child in running.children:
+            running_children.setdefault(child.text, child)
+        child_delta = ConfigDelta()
+        candidate_texts = set(child.text for child in candidate.children)
+        # Removals go first, so "no description old" doesn't undo the "description new" that replaces it
+        for child in running.children if remove else []:
+            if state_line_regex.match(child.text):
+                continue
+            # "no shutdown" in the candidate already takes care of "shutdown" in the running-config
+            if child.text not in candidate_texts and negate_line(child.text) not in candidate_texts:
+                child_delta.add_block([" " * (depth + 1) + negate_line(child.text)], 0, depth + 1, removed=1)
+        for child in candidate.children:
+            self.compare_line(running_children.get(child.text), child, child_delta, depth + 1, remove)
+
+        delta.skipped += child_delta.skipped + 1
+        if child_delta.lines:
+            delta.added += child_delta.added
+            delta.removed += child_delta.removed
+            # Enter the section, change its children, and leave it again
+            delta.lines += [" " * depth + candidate.text] + child_delta.lines + [" " * (depth + 1) + "exit"]
+
+    def indented_lines(self, line, depth):
+        """
+        Returns a line and every line below it, indented by one space per level starting at depth.
+        """
+        result = [" " * depth + line.text]
+        for child in line.children:
+            result += self.indented_lines(child, depth + 1)
+        return result
+
+    def merge(self, config, section_types=None):
+        """
+        Merges a fragment of configuration into the tree, like the output of "show running-config interface Gi1/1".
+        Sections in the fragment replace the sections with the same type and name, other sections are kept.
+        Lines outside of indexed sections (headers, "end", error messages) are not merged.
+        :param config: list of configuration lines, or a multiline string
+        :param section_types: only merge sections of these types. Filters like "| section vrf" also show
+            sections that merely mention the word, and those might not be complete.
+        :return: list of (section_type, name) tuples that were merged
+        """
+        fragment = ConfigTree(config)
+        merged = []
+        for section_type, sections in fragment.sections.items():
+            if section_types is not None and section_type not in section_types:
+                continue
+            for name in sections:
+                self.remove_section(section_type, name)
+                merged.append((section_type, name))
+        new_lines = []
+        for line in fragment.lines:
+            section_type = fragment.get_section_type(line)
+            if section_type is not None and (section_types is None or section_type in section_types):
+                new_lines += line.lines()
+        self.add_lines(new_lines)
+        return merged
+
+
+class ConfigDelta:
+    """
+    The commands that turn a running-config into a candidate configuration, from ConfigTree.get_delta().
+
+    :var self.lines: the commands to send, indented like configuration. Sections that only change some children are
+        entered, changed and left again with "exit".
+    :var self.added: the number of candidate lines that will be sent
+    :var self.removed: the number of running-config lines that will be removed with "no"
+    :var self.skipped: the number of candidate lines that are already configured and won't be sent
+    """
+
+    def __init__(self):
+        self.lines = []
+        self.added = 0
+        self.removed = 0
+        self.skipped = 0
+
+    def __len__(self):
+        return len(self.lines)
+
+    def add_block(self, lines, added, depth, removed=0):
+        """
+        Adds commands to the delta. Whole new sections also get an "exit", so the next command is sent from the
+        parent section again.
+        """
+        self.lines += lines
+        self.added += added
+        self.removed += removed
+        if len(lines) > 1:
+            self.lines.append(" " * (depth + 1) + "exit")
+
+    def report(self):
+        """
+        Returns a summary of the delta followed by its commands, to show before anything is sent.
+        """
+        summary = "{} lines to add, {} lines to remove, {} lines skipped because they are already configured.".format(
+            self.added, self.removed, self.skipped)
+        return "\n".join([summary, ""] + self.lines)
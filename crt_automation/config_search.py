@@ -0,0 +1,250 @@
+# $language = "Python3"
+# $interface = "1.0"
+
+# An on-disk index for searching archived configurations and saved show outputs of many devices at once, like
+# "which devices have ip helper-address 10.1.1.1". Every three-character sequence (trigram) of every line points at
+# the documents that contain it, so a search only reads the few documents that can match, instead of all of them.
+# The index is a SQLite database, so documents can be added one at a time while it stays on disk.
+
+import os
+import re
+import zlib
+import sqlite3
+import hashlib
+import logging
+try:
+    import re._parser as sre_parse
+except ImportError:
+    import sre_parse
+
+from crt_automation.config_archive import default_archive_dir
+
+logger = logging.getLogger()
+
+default_index_path = os.path.join(default_archive_dir, "search_index.sqlite")
+
+
+def line_trigrams(lines):
+    """
+    Returns the set of lowercase trigrams in a list of lines. Lowercase, so case-insensitive searches can use them.
+    """
+    trigrams = set()
+    for line in lines:
+        line = line.lower()
+        for start in range(len(line) - 2):
+            trigrams.add(line[start:start + 3])
+    return trigrams
+
+
+def required_literals(pattern, flags=0):
+    """
+    Returns strings that every match of a regular expression has to contain, so the index can narrow the documents
+    down before the regular expression runs. Only literal text outside of alternations and repeats is used, and
+    none from case-insensitive groups like "(?i:...)" in a case-sensitive pattern.
+    Example: r"ip helper-address 10\\.1\\.\\d+\\.1" returns ["ip helper-address 10.1.", ".1"]
+    :param pattern: the regular expression
+    :param flags: re flags the pattern is compiled with
+    :return: list of strings, empty if nothing is required
+    """
+    literals = []
+    current = []
+
+    def walk(items):
+        for operation, argument in items:
+            if operation == sre_parse.LITERAL:
+                current.append(chr(argument))
+                continue
+            if operation == sre_parse.SUBPATTERN:
+                if len(argument) == 4 and argument[1] & re.IGNORECASE and not flags & re.IGNORECASE:
+                    # "(?i:...)" matches in any case, but the literals are checked as they are written
+                    if current:
+                        literals.append("".join(current))
+                        del current[:]
+                    continue
+                # (?:...) and (...) without alternation are just more of the sequence
+                walk(argument[-1])
+                continue
+            if current:
+                literals.append("".join(current))
+                del current[:]
+            if operation == sre_parse.MAX_REPEAT or operation == sre_parse.MIN_REPEAT:
+                minimum, maximum, sub_items = argument
+                if minimum >= 1:
+                    # "x+" or "(abc){2,}" still contains its contents once
+                    walk(sub_items)
+                    if current:
+                        literals.append("".join(current))
+                        del current[:]
+
+    walk(sre_parse.parse(pattern, flags))
+    if current:
+        literals.append("".join(current))
+    return [literal for literal in literals if literal]
+
+
+class ConfigIndex:
+    """
+    A trigram index of documents: configuration versions from ConfigArchive, or saved command output. Each document
+    belongs to a device and has a kind, like "config" or "show ip interface brief", and a version (its hash).
+    The newest version of each device and kind is its current one, and searches only look at current documents
+    unless asked for every version.
+    Example:
+        index = ConfigIndex()
+        archive = ConfigArchive(search_index=index)
+        ... archive configurations ...
+        for device, kind, version, line_number, line in index.search("ip helper-address 10.1.1.1"):
+
+    :var self.path: the SQLite database file
+    """
+
+    def __init__(self, path=None):
+        if path is None:
+            path = default_index_path
+        self.path = path
+        directory = os.path.dirname(os.path.abspath(path))
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        self.connection = sqlite3.connect(path)
+        # Each added document is its own transaction, and WAL makes those much cheaper than the default journal
+        self.connection.execute("PRAGMA journal_mode = WAL")
+        self.connection.execute("PRAGMA synchronous = NORMAL")
+        self.connection.executescript("""
+            CREATE TABLE IF NOT EXISTS documents (
+                id INTEGER PRIMARY KEY, device TEXT, kind TEXT, version TEXT, current INTEGER, content BLOB,
+                UNIQUE (device, kind, version));
+            CREATE INDEX IF NOT EXISTS current_documents ON documents (current, device);
+            CREATE TABLE IF NOT EXISTS postings (trigram TEXT, document INTEGER, PRIMARY KEY (trigram, document))
+                WITHOUT ROWID;
+        """)
+
+    def close(self):
+        self.connection.close()
+
+    def add(self, device, lines, version=None, kind="config"):
+        """
+        Indexes a document and makes it the current one of its device and kind. A version that is already indexed
+        only becomes current again, like when a configuration change was undone.
+        :param device: the device's name, like its hostname
+        :param lines: list of lines, or a multiline string
+        :param version: the document's version, like its ConfigArchive hash. By default, the hash of the lines.
+        :param kind: "config", or the command that produced the lines
+        :return: True if the document was new to the index
+        """
+        if isinstance(lines, str):
+            lines = lines.splitlines()
+        if version is None:
+            version = hashlib.sha256("\n".join(lines).encode("utf-8")).hexdigest()
+        with self.connection:
+            self.connection.execute("UPDATE documents SET current = 0 WHERE device = ? AND kind = ? AND current = 1",
+                                    (device, kind))
+            row = self.connection.execute("SELECT id FROM documents WHERE device = ? AND kind = ? AND version = ?",
+                                          (device, kind, version)).fetchone()
+            if row is not None:
+                self.connection.execute("UPDATE documents SET current = 1 WHERE id = ?", (row[0],))
+                return False
+            content = zlib.compress("\n".join(lines).encode("utf-8"))
+            document_id = self.connection.execute(
+                "INSERT INTO documents (device, kind, version, current, content) VALUES (?, ?, ?, 1, ?)",
+                (device, kind, version, content)).lastrowid
+            # One row per trigram and document, kept in trigram order, so a trigram's documents are read in one range
+            self.connection.executemany("INSERT INTO postings (trigram, document) VALUES (?, ?)",
+                                        ((trigram, document_id) for trigram in line_trigrams(lines)))
+        logger.debug("<ConfigIndex.add> Indexed {} {} version {}.".format(device, kind, version[:12]))
+        return True
+
+    def candidates(self, literals, current_only=True, kind=None):
+        """
+        Returns the IDs of the documents that contain every trigram of every literal.
+        :param literals: strings the documents must contain. With no trigrams in them, every document is a candidate.
+        :param current_only: only current documents
+        :param kind: only documents of this kind
+        :return: set of document IDs
+        """
+        trigrams = line_trigrams(literals)
+        documents = None
+        if trigrams:
+            postings = []
+            for trigram in trigrams:
+                posting = set(row[0] for row in self.connection.execute(
+                    "SELECT document FROM postings WHERE trigram = ?", (trigram,)))
+                if not posting:
+                    return set()
+                postings.append(posting)
+            # Intersect the shortest posting lists first
+            postings.sort(key=len)
+            documents = postings[0]
+            for posting in postings[1:]:
+                documents = documents & posting
+                if not documents:
+                    return set()
+        query = "SELECT id FROM documents WHERE 1 = 1"
+        arguments = []
+        if current_only:
+            query += " AND current = 1"
+        if kind is not None:
+            query += " AND kind = ?"
+            arguments.append(kind)
+        allowed = set(row[0] for row in self.connection.execute(query, arguments))
+        if documents is None:
+            return allowed
+        return documents & allowed
+
+    def search(self, text=None, regex=None, ignore_case=False, current_only=True, kind=None):
+        """
+        Finds lines in the indexed documents, with a substring or a regular expression.
+        :param text: the substring to find
+        :param regex: a regular expression to search each line with, instead of text
+        :param ignore_case: match regardless of case
+        :param current_only: only search the current version of each device's documents
+        :param kind: only search documents of this kind, like "config"
+        :return: list of (device, kind, version, line number, line) tuples, line numbers counting from 1
+        """
+        flags = re.IGNORECASE if ignore_case else 0
+        if regex is not None:
+            compiled = re.compile(regex, flags)
+            literals = required_literals(regex, flags)
+            # Inline flags like "(?i)" count too
+            ignore_case = bool(compiled.flags & re.IGNORECASE)
+        elif ignore_case:
+            compiled = re.compile(re.escape(text), flags)
+            literals = [text]
+        else:
+            compiled = None
+            literals = [text]
+        documents = self.candidates(literals, current_only, kind)
+        if ignore_case:
+            literals = [literal.lower() for literal in literals]
+        results = []
+        for document_id in sorted(documents):
+            device, document_kind, version, content = self.connection.execute(
+                "SELECT device, kind, version, content FROM documents WHERE id = ?", (document_id,)).fetchone()
+            content = zlib.decompress(content).decode("utf-8")
+            if compiled is None:
+                # Find the text in the whole document, and only split out the lines it is on
+                position = content.find(text)
+                while position != -1:
+                    line_start = content.rfind("\n", 0, position) + 1
+                    line_end = content.find("\n", position)
+                    if line_end == -1:
+                        line_end = len(content)
+                    results.append((device, document_kind, version, content.count("\n", 0, line_start) + 1,
+                                    content[line_start:line_end]))
+                    position = content.find(text, line_end)
+                continue
+            # Trigrams can come from different lines, so check that the document really has the literal text
+            searched = content.lower() if ignore_case else content
+            if not all(literal in searched for literal in literals):
+                continue
+            for number, line in enumerate(content.split("\n"), 1):
+                if compiled.search(line):
+                    results.append((device, document_kind, version, number, line))
+        logger.debug("<ConfigIndex.search> {} candidate documents, {} matching lines.".format(len(documents),
+                                                                                             len(results)))
+        return results
+
+    def devices(self, text=None, regex=None, ignore_case=False, kind="config"):
+        """
+        Returns the devices whose current documents have a matching line, like every device with
+        "ip helper-address 10.1.1.1".
+        """
+        return sorted(set(result[0] for result in self.search(text, regex, ignore_case, True, kind)))
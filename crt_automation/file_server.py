@@ -0,0 +1,326 @@
+# $language = "Python3"
+# $interface = "1.0"
+
+# A small read-only TFTP server (RFC 1350, with the blksize, tsize and timeout options of RFC 2347-2349), so a device
+# can copy a file straight from the computer running SecureCRT, like "copy tftp://10.0.0.5/r1.cfg running-config".
+# Only the files added to the server can be read, nothing can be written.
+
+import os
+import socket
+import struct
+import logging
+import threading
+
+logger = logging.getLogger()
+
+# TFTP opcodes
+RRQ = 1
+WRQ = 2
+DATA = 3
+ACK = 4
+ERROR = 5
+OACK = 6
+
+# TFTP error codes
+FILE_NOT_FOUND = 1
+ACCESS_VIOLATION = 2
+ILLEGAL_OPERATION = 4
+
+default_block_size = 512
+max_block_size = 65464
+
+
+def get_local_address(remote_address):
+    """
+    Returns the address of the local interface that traffic to remote_address leaves from, which is the address the
+    device has to copy from. Nothing is sent, a UDP socket is only connected to look up the route.
+    :param remote_address: the device's address, like "10.1.1.1"
+    :return: the local IP address as a string
+    """
+    probe = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    try:
+        probe.connect((remote_address, 69))
+        return probe.getsockname()[0]
+    finally:
+        probe.close()
+
+
+class TftpServer:
+    """
+    Serves files to TFTP clients from a background thread. Each transfer gets its own socket and thread, like RFC 1350
+    asks for, so several devices can copy at the same time.
+    Example:
+        server = TftpServer()
+        server.add_file("r1.cfg", config_text)
+        server.start()
+        ... the device runs "copy tftp://<address>/r1.cfg running-config" ...
+        server.stop()
+
+    :var self.files: dictionary mapping file names to their contents as bytes
+    :var self.root: a folder to serve files from when they aren't in self.files, or None
+    :var self.transfers: list of (file name, client address, bytes sent, completed) tuples, one per finished transfer
+    """
+
+    def __init__(self, host="0.0.0.0", port=69, root=None, timeout=5, retries=5):
+        self.host = host
+        self.port = port
+        self.root = root
+        self.timeout = timeout
+        self.retries = retries
+        self.files = {}
+        self.transfers = []
+        self.socket = None
+        self.thread = None
+        self.running = False
+        self.lock = threading.Lock()
+        self.transfer_done = threading.Condition(self.lock)
+
+    def add_file(self, name, data):
+        """
+        Makes a file available to clients.
+        :param name: the file name clients ask for, like "r1.cfg"
+        :param data: the file's contents, as bytes or a string
+        """
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        self.files[name.lstrip("/")] = data
+
+    def get_file(self, name):
+        """
+        Returns the contents of a file clients asked for, or None if the server doesn't have it.
+        Files from self.root can't be outside of self.root.
+        """
+        name = name.lstrip("/")
+        if name in self.files:
+            return self.files[name]
+        if self.root is None:
+            return None
+        root = os.path.realpath(self.root)
+        path = os.path.realpath(os.path.join(root, name))
+        if not path.startswith(root + os.sep) or not os.path.isfile(path):
+            return None
+        with open(path, "rb") as served_file:
+            return served_file.read()
+
+    def start(self):
+        """
+        Opens the server's socket and starts answering requests in a background thread.
+        Raises OSError if the port can't be used, like port 69 without administrator rights or with another TFTP
+        server running.
+        :return: the port the server listens on, which is picked by the OS if self.port is 0
+        """
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        # No SO_REUSEADDR: on UDP it lets the bind succeed next to a TFTP server that already has the port, and
+        # then that server gets the requests. Windows shares ports even without it, unless they are exclusive.
+        if hasattr(socket, "SO_EXCLUSIVEADDRUSE"):
+            self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_EXCLUSIVEADDRUSE, 1)
+        try:
+            self.socket.bind((self.host, self.port))
+        except OSError:
+            self.socket.close()
+            self.socket = None
+            raise
+        self.socket.settimeout(0.5)
+        self.port = self.socket.getsockname()[1]
+        self.running = True
+        self.thread = threading.Thread(target=self.serve, name="TftpServer", daemon=True)
+        self.thread.start()
+        logger.debug("<TftpServer.start> Listening on {}:{}".format(self.host, self.port))
+        return self.port
+
+    def stop(self):
+        """
+        Stops answering new requests and closes the server's socket. Transfers that already started finish on their
+        own threads.
+        """
+        self.running = False
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+        if self.socket is not None:
+            self.socket.close()
+            self.socket = None
+
+    def url(self, name, address=None):
+        """
+        Returns the URL a device copies a file from, like "tftp://10.0.0.5/r1.cfg".
+        :param name: the file name
+        :param address: the address the device reaches this computer on, see get_local_address()
+        """
+        if address is None:
+            address = self.host
+        if self.port != 69:
+            address = "{}:{}".format(address, self.port)
+        return "tftp://{}/{}".format(address, name.lstrip("/"))
+
+    def wait_for_transfer(self, name, timeout=None):
+        """
+        Waits until a transfer of a file has finished.
+        :param name: the file name
+        :param timeout: the longest time to wait, in seconds
+        :return: the (file name, client address, bytes sent, completed) tuple of the transfer, or None on a timeout
+        """
+        name = name.lstrip("/")
+        with self.transfer_done:
+            self.transfer_done.wait_for(lambda: any(transfer[0] == name for transfer in self.transfers), timeout)
+            for transfer in reversed(self.transfers):
+                if transfer[0] == name:
+                    return transfer
+        return None
+
+    def serve(self):
+        while self.running:
+            try:
+                packet, client = self.socket.recvfrom(max_block_size + 4)
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+            if len(packet) < 4:
+                continue
+            opcode = struct.unpack("!H", packet[:2])[0]
+            if opcode == RRQ:
+                threading.Thread(target=self.send_file, args=(packet[2:], client), daemon=True).start()
+            else:
+                self.send_error(self.socket, client, ILLEGAL_OPERATION if opcode != WRQ else ACCESS_VIOLATION,
+                                "Only reading files is allowed")
+
+    def send_error(self, transfer_socket, client, code, message):
+        transfer_socket.sendto(struct.pack("!HH", ERROR, code) + message.encode("ascii") + b"\x00", client)
+
+    def send_file(self, request, client):
+        """
+        Runs one read request, from a new socket like RFC 1350 asks for.
+        :param request: the request packet without its opcode: file name, mode and options, each ending with a 0 byte
+        :param client: the client's (address, port)
+        """
+        fields = request.split(b"\x00")
+        name = fields[0].decode("ascii", "replace")
+        # Options come in name/value pairs after the mode
+        options = {}
+        for index in range(2, len(fields) - 1, 2):
+            options[fields[index].decode("ascii", "replace").lower()] = fields[index + 1].decode("ascii", "replace")
+
+        transfer_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        transfer_socket.bind((self.socket.getsockname()[0], 0))
+        transfer_socket.settimeout(self.timeout)
+        data = self.get_file(name)
+        if data is None:
+            logger.warning("<TftpServer.send_file> {} asked for unknown file {}".format(client[0], name))
+            self.send_error(transfer_socket, client, FILE_NOT_FOUND, "File not found")
+            transfer_socket.close()
+            with self.transfer_done:
+                self.transfers.append((name, client[0], 0, False))
+                self.transfer_done.notify_all()
+            return
+
+        block_size = default_block_size
+        accepted = {}
+        if "blksize" in options and options["blksize"].isdigit():
+            block_size = max(8, min(int(options["blksize"]), max_block_size))
+            accepted["blksize"] = str(block_size)
+        if "tsize" in options:
+            accepted["tsize"] = str(len(data))
+        if "timeout" in options and options["timeout"].isdigit() and 1 <= int(options["timeout"]) <= 255:
+            transfer_socket.settimeout(int(options["timeout"]))
+            accepted["timeout"] = options["timeout"]
+
+        sent = 0
+        completed = False
+        try:
+            if accepted:
+                # The client acknowledges the options with block 0
+                oack = struct.pack("!H", OACK) + b"".join(key.encode("ascii") + b"\x00" + value.encode("ascii") +
+                                                          b"\x00" for key, value in accepted.items())
+                if not self.send_packet(transfer_socket, client, oack, 0):
+                    return
+            block = 1
+            while True:
+                chunk = data[sent:sent + block_size]
+                if not self.send_packet(transfer_socket, client, struct.pack("!HH", DATA, block & 0xFFFF) + chunk,
+                                        block & 0xFFFF):
+                    return
+                sent += len(chunk)
+                block += 1
+                # A block shorter than block_size, even an empty one, ends the transfer
+                if len(chunk) < block_size:
+                    completed = True
+                    return
+        finally:
+            transfer_socket.close()
+            logger.debug("<TftpServer.send_file> Sent {} of {} bytes of {} to {}".format(sent, len(data), name,
+                                                                                      client[0]))
+            with self.transfer_done:
+                self.transfers.append((name, client[0], sent, completed))
+                self.transfer_done.notify_all()
+
+    def send_packet(self, transfer_socket, client, packet, block):
+        """
+        Sends a packet until the client acknowledges block, resending it when no acknowledgement comes in time.
+        :return: True once acknowledged, False if the client gave up or never answered
+        """
+        for attempt in range(self.retries):
+            transfer_socket.sendto(packet, client)
+            while True:
+                try:
+                    response, address = transfer_socket.recvfrom(516)
+                except socket.timeout:
+                    break
+                if address != client or len(response) < 4:
+                    continue
+                opcode, number = struct.unpack("!HH", response[:4])
+                if opcode == ERROR:
+                    logger.warning("<TftpServer.send_packet> {} stopped the transfer: {}".format(
+                        client[0], response[4:].rstrip(b"\x00").decode("ascii", "replace")))
+                    return False
+                if opcode == ACK and number == block:
+                    return True
+                # Acknowledgements of earlier blocks are duplicates, so keep waiting
+        logger.warning("<TftpServer.send_packet> {} didn't acknowledge block {}".format(client[0], block))
+        return False
+
+
+def tftp_get(host, name, port=69, block_size=None, timeout=5):
+    """
+    Downloads a file from a TFTP server. This is what a device does when it copies from a tftp:// URL, so it can be
+    used to check a TftpServer from the same computer.
+    :param host: the server's address
+    :param name: the file name
+    :param port: the server's port
+    :param block_size: ask for a larger block size than 512 bytes, if the server supports it
+    :param timeout: time in seconds to wait for each packet
+    :return: the file's contents as bytes
+    """
+    client = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    client.settimeout(timeout)
+    request = struct.pack("!H", RRQ) + name.encode("ascii") + b"\x00octet\x00"
+    if block_size is not None:
+        request += b"blksize\x00" + str(block_size).encode("ascii") + b"\x00"
+    try:
+        client.sendto(request, (host, port))
+        expected_size = default_block_size
+        received = []
+        block = 1
+        while True:
+            packet, server = client.recvfrom(max_block_size + 4)
+            opcode = struct.unpack("!H", packet[:2])[0]
+            if opcode == ERROR:
+                raise Exception("TFTP error: {}".format(packet[4:].rstrip(b"\x00").decode("ascii", "replace")))
+            if opcode == OACK:
+                fields = packet[2:].split(b"\x00")
+                options = dict(zip(fields[0::2], fields[1::2]))
+                expected_size = int(options.get(b"blksize", default_block_size))
+                client.sendto(struct.pack("!HH", ACK, 0), server)
+                continue
+            number = struct.unpack("!H", packet[2:4])[0]
+            if opcode == DATA and number == block & 0xFFFF:
+                received.append(packet[4:])
+                client.sendto(struct.pack("!HH", ACK, number), server)
+                block += 1
+                if len(packet) - 4 < expected_size:
+                    return b"".join(received)
+            elif opcode == DATA:
+                # A resent block we already have, acknowledge it again
+                client.sendto(struct.pack("!HH", ACK, number), server)
+    finally:
+        client.close()
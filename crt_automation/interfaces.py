@@ -0,0 +1,473 @@
+# $language = "Python3"
+# $interface = "1.0"
+
+# Interface name handling: turning abbreviations like "Gi1/0/1" into canonical names and back.
+# crt_automation.utilities keeps its old functions, which use the tables built here.
+
+import re
+import sys
+import functools
+
+# (abbreviation, long name) pairs. Earlier pairs win when an abbreviation could mean more than one interface type.
+replace_pairs = [
+    ("Ce", "Cellular"),
+    ("Eth", "Ethernet"),
+    ("Et", "FastEthernet"),
+    ("Gi", "GigabitEthernet"),
+    ("GE", "GigabitEthernet"),
+    ("Te", "TenGigabit"),
+    ("Se", "Serial"),
+    ("AT", "ATM"),
+    ("Po", "Port-channel"),
+    ("PortCh", "Port-channel"),
+    ("Tu", "Tunnel"),
+    ("Lo", "Loopback"),
+    ("NV", "NVI"),
+    ("FD", "Fddi"),
+    ("Vl", "Vlan"),
+    ("EO", "EOBC"),
+    ("Vi", "Virtual-Access"),
+    ("Vt", "Virtual-Template"),
+    ("In", "Internal-Data"),
+    ("Async", "Async"),
+    ("Group-Async", "Group-Async"),
+    ("mgmt", "mgmt"),
+    ("Ma", "Management")
+]
+
+# Pairs that come before replace_pairs on one OS, keyed by runner class name like the TextFSM index
+os_replace_pairs = {
+    "XE": [("Fa", "FastEthernet"),
+           ("Te", "TenGigabitEthernet"),
+           ("Fo", "FortyGigabitEthernet"),
+           ("Hu", "HundredGigE"),
+           ("Twe", "TwentyFiveGigE"),
+           ("Ap", "AppGigabitEthernet")],
+    "NXOS": [("Eth", "Ethernet"),
+             ("Po", "port-channel"),
+             ("mgmt", "mgmt"),
+             ("Lo", "loopback"),
+             ("Vlan", "Vlan"),
+             ("Tunnel", "Tunnel")],
+    "XR": [("Gi", "GigabitEthernet"),
+           ("Te", "TenGigE"),
+           ("Fo", "FortyGigE"),
+           ("Hu", "HundredGigE"),
+           ("BE", "Bundle-Ether"),
+           ("Mg", "MgmtEth"),
+           ("BV", "BVI")],
+    "ASA": [("Gi", "GigabitEthernet"),
+            ("Te", "TenGigabitEthernet"),
+            ("Ma", "Management"),
+            ("Po", "Port-channel")]
+}
+
+# Splits "Gi1/0/1", "GigabitEthernet 1/0/1" or "Port-channel10" into the type and the numbers
+interface_parts_regex = re.compile(r"^\s*([A-Za-z][A-Za-z-]*?)\s*(\d[\d/:.]*)\s*$")
+
+
+def split_interface(name):
+    """
+    :param name: an interface name, like "Gi1/0/1" or "GigabitEthernet 1/0/1"
+    :return: (type, numbers) tuple like ("Gi", "1/0/1"), or None if name doesn't look like an interface
+    """
+    match = interface_parts_regex.match(name)
+    if match is None:
+        return None
+    return match.group(1), match.group(2)
+
+
+class InterfaceNames:
+    """
+    Converts between abbreviated and canonical interface names with dictionary lookups, instead of trying every
+    pair with a regular expression. Every prefix of a long name that isn't shared with another type works too, like
+    "Gig" or "GigabitE", the way the Cisco CLI accepts them. Results are memoized and interned, since the same
+    names come up over and over in CDP and MAC address tables.
+
+    :var self.long_names: dictionary mapping lowercase abbreviations and prefixes to long names
+    :var self.short_names: dictionary mapping lowercase long names to their abbreviation
+    """
+
+    def __init__(self, pairs=None, cache_size=4096):
+        if pairs is None:
+            pairs = replace_pairs
+        self.pairs = list(pairs)
+        self.long_names = {}
+        self.short_names = {}
+        prefixes = {}
+        for abbreviation, long_name in self.pairs:
+            # The first pair for an abbreviation or a long name wins, like it did with the old linear scan.
+            self.long_names.setdefault(abbreviation.lower(), long_name)
+            self.long_names.setdefault(long_name.lower(), long_name)
+            self.short_names.setdefault(long_name.lower(), abbreviation)
+            for length in range(1, len(long_name)):
+                prefixes.setdefault(long_name[:length].lower(), set()).add(long_name)
+        for prefix, long_names in prefixes.items():
+            if len(long_names) == 1 and prefix not in self.long_names:
+                self.long_names[prefix] = long_names.pop()
+        self.long_name = functools.lru_cache(maxsize=cache_size)(self.expand)
+        self.short_name = functools.lru_cache(maxsize=cache_size)(self.shorten)
+
+    def expand(self, name):
+        """
+        Returns the canonical name for an abbreviated interface name, like "GigabitEthernet1/0/1" for "gi1/0/1".
+        Names that can't be expanded are returned without changes. Use self.long_name(), which is memoized.
+        """
+        parts = split_interface(name)
+        if parts is None:
+            return name
+        long_name = self.long_names.get(parts[0].lower())
+        if long_name is None:
+            return name
+        return sys.intern(long_name + parts[1])
+
+    def shorten(self, name):
+        """
+        Returns the abbreviation of an interface name, like "Gi1/0/1" for "GigabitEthernet1/0/1".
+        Names that can't be shortened are returned without changes. Use self.short_name(), which is memoized.
+        """
+        parts = split_interface(name)
+        if parts is None:
+            return name
+        long_name = self.long_names.get(parts[0].lower())
+        if long_name is None:
+            return name
+        return sys.intern(self.short_names[long_name.lower()] + parts[1])
+
+
+class InterfaceIndex:
+    """
+    Maps every way of writing a device's interfaces to the names the device uses, so each lookup is one dictionary
+    access instead of a scan of the interface list. "Gi1/0/1", "gig 1/0/1" and "GigabitEthernet1/0/1" all find
+    "GigabitEthernet1/0/1". Abbreviations that fit more than one of the device's interfaces aren't indexed.
+
+    :var self.interfaces: the device's interface names
+    :var self.names: dictionary mapping lowercase abbreviations to interface names
+    """
+
+    def __init__(self, interfaces, interface_names=None):
+        if interface_names is None:
+            interface_names = default_interface_names
+        self.interfaces = list(interfaces)
+        self.names = {}
+        ambiguous = set()
+        for interface in self.interfaces:
+            parts = split_interface(interface)
+            if parts is None:
+                self.names[interface.lower()] = interface
+                continue
+            interface_type, numbers = parts
+            keys = set(interface_type[:length].lower() for length in range(1, len(interface_type) + 1))
+            abbreviation = interface_names.short_names.get(interface_type.lower())
+            if abbreviation:
+                keys.add(abbreviation.lower())
+            for key in keys:
+                key += numbers
+                if key in self.names and self.names[key] != interface:
+                    ambiguous.add(key)
+                else:
+                    self.names[key] = sys.intern(interface)
+        for key in ambiguous:
+            del self.names[key]
+
+    def __contains__(self, name):
+        return self.lookup(name) is not None
+
+    def lookup(self, name):
+        """
+        :param name: an interface name in any form, like "Gi1/0/1" or "gig 1/0/1"
+        :return: the name the device uses, or None if it isn't one of the device's interfaces
+        """
+        parts = split_interface(name)
+        if parts is None:
+            return self.names.get(name.lower())
+        return self.names.get(parts[0].lower() + parts[1])
+
+
+default_interface_names = InterfaceNames()
+os_interface_names = {}
+
+
+def get_interface_names(os_name=None):
+    """
+    Returns the InterfaceNames for an OS, with its pairs from os_replace_pairs in front of replace_pairs.
+    Each one is built once and shared.
+    :param os_name: a runner class name like "NXOS" or "XR", or None for the default pairs
+    """
+    if os_name not in os_replace_pairs:
+        return default_interface_names
+    if os_name not in os_interface_names:
+        os_interface_names[os_name] = InterfaceNames(os_replace_pairs[os_name] + replace_pairs)
+    return os_interface_names[os_name]
+
+
+# Finds candidate interface names in any text: a word of two or more letters, then the numbers, with a space in
+# between only if the numbers have a slot ("Gig 1/0/1"). The lookbehind anchors matches to the start of a word, and
+# the lookahead rejects numbers that continue, like IP addresses. Nothing in it can backtrack more than one word.
+interface_candidate_regex = re.compile(r"(?<![\w.:/-])([A-Za-z][A-Za-z-]{1,30})"
+                                       r"(?:(\d{1,5}(?:[/:]\d{1,5}){0,4})|\s(\d{1,5}(?:[/:]\d{1,5}){1,4}))"
+                                       r"(\.\d{1,6})?(?![\w.:/])")
+
+# Numbers that are a time of day, like "14:02:13", and not an interface's slots
+time_of_day_regex = re.compile(r"^\d{1,2}:\d{2}:\d{2}$")
+
+# Abbreviations "show cdp neighbors" writes with a space before the numbers, like "Gig 1/0/1"
+spaced_abbreviations = ["Gig", "Ten", "Fas", "Eth", "Hun"]
+
+
+class InterfaceExtractor:
+    """
+    Pulls interface names out of large outputs like "show interfaces" or "show tech-support" in one pass.
+    Candidates are only kept if their type is a known interface type or abbreviation, written in the case devices
+    write it, which keeps out IP addresses and words that happen to end in numbers, like "at 14:02:13". A type
+    separated from its numbers by a space has to be a full long name or a known abbreviation of at least three
+    letters ("Gig 1/0/1", not "In 1/2" or "Port 1/1"), and times of day are never interfaces. Names are returned in
+    their canonical form, once each, with the numbers of the lines they were found on.
+
+    :var self.interface_names: the InterfaceNames used to check and expand interface types
+    :var self.type_names: dictionary mapping interface types, as they are written in output, to long names
+    :var self.spaced_type_names: the part of self.type_names that is also taken with a space before the numbers
+    """
+
+    def __init__(self, interface_names=None):
+        if interface_names is None:
+            interface_names = default_interface_names
+        self.interface_names = interface_names
+        # The abbreviations as they are in the pairs, every prefix of a long name in the long name's case, and the
+        # long names in lowercase
+        self.type_names = {}
+        for abbreviation, long_name in interface_names.pairs:
+            self.type_names.setdefault(abbreviation, interface_names.long_names[abbreviation.lower()])
+        for key, long_name in interface_names.long_names.items():
+            if long_name.lower().startswith(key):
+                self.type_names.setdefault(long_name[:len(key)], long_name)
+            self.type_names.setdefault(long_name.lower(), long_name)
+        # Prefixes like "Internal" or "Port" are ordinary words, so with a space only whole names count
+        self.spaced_type_names = {}
+        known = [abbreviation for abbreviation, long_name in interface_names.pairs] + spaced_abbreviations
+        for long_name in set(interface_names.long_names.values()):
+            known += [long_name, long_name.lower()]
+        for type_name in known:
+            if len(type_name) >= 3 and type_name in self.type_names:
+                self.spaced_type_names[type_name] = self.type_names[type_name]
+
+    def extract(self, output):
+        """
+        :param output: the output as one string, or an iterable of lines (like CiscoRunner.iter_command_output())
+        :return: dictionary mapping canonical interface names to the line numbers they were found on, counting from
+            1, in the order the names were first found
+        """
+        if isinstance(output, str):
+            return self.extract_text(output)
+        found = {}
+        for line_number, line in enumerate(output, 1):
+            self.extract_line(line, line_number, found)
+        return found
+
+    def extract_text(self, text):
+        found = {}
+        line_number = 1
+        position = 0
+        for match in interface_candidate_regex.finditer(text):
+            long_name = self.get_long_name(match)
+            if long_name is None:
+                continue
+            # Count the newlines since the last match, so every character is only counted once.
+            line_number += text.count("\n", position, match.start())
+            position = match.start()
+            self.add(found, long_name, match, line_number)
+        return found
+
+    def extract_line(self, line, line_number, found):
+        for match in interface_candidate_regex.finditer(line):
+            long_name = self.get_long_name(match)
+            if long_name is not None:
+                self.add(found, long_name, match, line_number)
+
+    def get_long_name(self, match):
+        """
+        Returns the long name of a candidate's interface type, or None if the candidate isn't an interface.
+        """
+        if match.group(3) is not None:
+            long_name = self.spaced_type_names.get(match.group(1))
+        else:
+            long_name = self.type_names.get(match.group(1))
+        if long_name is None:
+            return None
+        if time_of_day_regex.match(match.group(2) or match.group(3)):
+            return None
+        return long_name
+
+    def add(self, found, long_name, match, line_number):
+        name = long_name + (match.group(2) or match.group(3)) + (match.group(4) or "")
+        line_numbers = found.get(name)
+        if line_numbers is None:
+            found[sys.intern(name)] = [line_number]
+        elif line_numbers[-1] != line_number:
+            line_numbers.append(line_number)
+
+
+# How each OS writes "interface range" commands, keyed by runner class name. command goes in front of the range list,
+# max_ranges is the number of comma-separated ranges one command takes, and max_length the longest range list it
+# takes. NX-OS has no "range" keyword, "interface Eth1/1-32, Eth1/40" takes a range list. None means the OS can't
+# configure several interfaces at once, so interfaces are configured one at a time.
+range_formats = {
+    "CiscoRunner": {"command": "interface range ", "separator": " - ", "max_ranges": 5, "max_length": 200},
+    "XE": {"command": "interface range ", "separator": " - ", "max_ranges": 5, "max_length": 200},
+    "NXOS": {"command": "interface ", "separator": "-", "max_ranges": 32, "max_length": 400},
+    "XR": None,
+    "ASA": None,
+    "WAAS": None,
+    "AireOS": None
+}
+
+# Interface types "interface range" doesn't reliably take on IOS and NX-OS, as lowercase long names. These are
+# configured one interface at a time, like subinterfaces.
+virtual_interface_types = {"loopback", "vlan", "port-channel", "tunnel", "mgmt", "management", "mgmteth", "nvi",
+                           "bvi", "bundle-ether", "virtual-access", "virtual-template", "group-async", "eobc",
+                           "internal-data", "cellular", "async"}
+
+# One item of a range list: an optional type, the slots, and the last number or range of numbers,
+# like "Gi1/0/1-48", "Eth1/1", "Po10" or just "5-7" to reuse the type and slots of the item before it.
+range_item_regex = re.compile(r"^([A-Za-z][A-Za-z-]*?)?\s*((?:\d+[/:])*)(\d+)(?:\s*-\s*(\d+))?(\.\d+)?$")
+
+
+def is_rangeable_interface(name, interface_names=None):
+    """
+    Returns whether an interface can be part of an "interface range": a physical port, not a subinterface or a
+    virtual interface like a Loopback, Vlan or mgmt0.
+    :param name: an interface name, in any form
+    :param interface_names: InterfaceNames used to expand the type, defaults to default_interface_names
+    """
+    if interface_names is None:
+        interface_names = default_interface_names
+    match = range_item_regex.match(interface_names.long_name(name))
+    if match is None or match.group(1) is None or match.group(4) or match.group(5):
+        return False
+    return match.group(1).lower() not in virtual_interface_types
+
+
+def iter_number_range(num_string):
+    """
+    Yields the numbers in a number range like "1,3,5-7" one at a time, without building a list.
+    """
+    for item in num_string.split(","):
+        bounds = item.split("-")
+        for number in range(int(bounds[0]), int(bounds[-1]) + 1):
+            yield number
+
+
+def iter_interface_range(range_string, interface_names=None):
+    """
+    Yields the interfaces in an interface range one at a time, so even huge ranges aren't held in memory.
+    Any slot depth works, like "Gi1/0/1-48,Te1/1/1-4", NX-OS "Eth1/1-32" or IOS "Gi1/0/1 - 4, Gi1/0/10".
+    An item without a type, like the "6" in "Gi1/1-4,6", reuses the type and slots of the item before it.
+    :param range_string: the interface range
+    :param interface_names: InterfaceNames used to expand the types, defaults to default_interface_names
+    :return: generator of long interface names
+    """
+    if interface_names is None:
+        interface_names = default_interface_names
+    interface_type = None
+    slots = ""
+    for item in range_string.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        match = range_item_regex.match(item)
+        if match is None:
+            raise ValueError("Not an interface range: '{}'".format(item))
+        if match.group(1):
+            interface_type = interface_names.long_name(match.group(1) + "0")[:-1]
+            slots = match.group(2)
+        elif interface_type is None:
+            raise ValueError("Interface range '{}' doesn't start with an interface type".format(range_string))
+        elif match.group(2):
+            slots = match.group(2)
+        first = int(match.group(3))
+        last = int(match.group(4)) if match.group(4) else first
+        subinterface = match.group(5) or ""
+        for number in range(first, last + 1):
+            yield interface_type + slots + str(number) + subinterface
+
+
+def compact_interfaces(interfaces, range_format=None, interface_names=None, abbreviate=True):
+    """
+    Turns a set of interfaces back into as few interface range lists as possible. Consecutive port numbers in the
+    same slot become one range, and ranges are packed into lists within the limits of range_format.
+    With a range_format, each list only holds ports of one type, and interfaces that can't be part of a range (see
+    is_rangeable_interface()) get a list of their own.
+    Example: ["Gi1/0/1", "Gi1/0/2", "Gi1/0/3", "Gi1/0/7"] becomes ["Gi1/0/1 - 3, Gi1/0/7"]
+    :param interfaces: iterable of interface names, in any form and order, duplicates are fine
+    :param range_format: a value of range_formats. None means every interface gets its own list.
+    :param interface_names: InterfaceNames used to expand and shorten the types
+    :param abbreviate: write types abbreviated, like "Gi", which fits more ranges into max_length
+    :return: list of range lists, each one to follow "interface range", in the order the slots were first seen
+    """
+    if interface_names is None:
+        interface_names = default_interface_names
+    # (type, slots) -> set of port numbers, in the order each slot was first seen
+    groups = {}
+    singles = []
+    for interface in interfaces:
+        name = interface_names.long_name(interface)
+        if abbreviate:
+            name = interface_names.short_name(name)
+        match = range_item_regex.match(name)
+        if match is None or match.group(1) is None or match.group(5) or \
+                (range_format is not None and not is_rangeable_interface(name, interface_names)):
+            # Subinterfaces, virtual interfaces and odd names can't be part of a range
+            if name not in singles:
+                singles.append(name)
+            continue
+        groups.setdefault((match.group(1), match.group(2)), set()).add(int(match.group(3)))
+
+    if range_format is None:
+        separator = "-"
+    else:
+        separator = range_format["separator"]
+    ranges = []
+    for (interface_type, slots), numbers in groups.items():
+        numbers = sorted(numbers)
+        start = previous = numbers[0]
+        for number in numbers[1:] + [None]:
+            if number is not None and number == previous + 1:
+                previous = number
+                continue
+            if start == previous:
+                ranges.append((interface_type, "{}{}{}".format(interface_type, slots, start)))
+            else:
+                ranges.append((interface_type, "{}{}{}{}{}".format(interface_type, slots, start, separator, previous)))
+            start = previous = number
+
+    if range_format is None:
+        return [interface_range for interface_type, interface_range in ranges] + singles
+    range_lists = []
+    current = []
+    current_type = None
+    length = 0
+    for interface_type, interface_range in ranges:
+        added_length = len(interface_range) + (2 if current else 0)
+        if current and (len(current) >= range_format["max_ranges"] or interface_type != current_type or
+                        length + added_length > range_format["max_length"]):
+            range_lists.append(", ".join(current))
+            current = []
+            length = 0
+            added_length = len(interface_range)
+        current.append(interface_range)
+        current_type = interface_type
+        length += added_length
+    if current:
+        range_lists.append(", ".join(current))
+    return range_lists + singles
+
+
+def get_range_format(os_name=None):
+    """
+    Returns how an OS writes "interface range" commands, see range_formats.
+    :param os_name: a runner class name like "XE" or "NXOS"
+    :return: dictionary with the separator and limits, or None if the OS has no "interface range" command
+    """
+    if os_name in range_formats:
+        return range_formats[os_name]
+    return range_formats["CiscoRunner"]
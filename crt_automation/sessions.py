@@ -5,24 +5,44 @@ import logging
 import os
 import toml
 import time
+import threading
+import concurrent.futures
 from runners.common_runner import CommonRunner
 from runners.cisco.cisco_runner import CiscoRunner
 from runners.nix import LinuxRunner
 import runners.cisco
 import crt_automation.utilities
 
+# Runner classes for the OS names set by Session.start_cisco_session(), used to restore cached device profiles
+cisco_os_runners = {
+    "UNKNOWN": CiscoRunner,
+    "XE": runners.cisco.XE,
+    "NXOS": runners.cisco.NXOS,
+    "XR": runners.cisco.XR,
+    "ASA": runners.cisco.ASA,
+    "WAAS": runners.cisco.WAAS
+}
+
 
 class CrtSession:
-    def __init__(self, crt):
+    def __init__(self, crt, cache_path=None):
         self.crt = crt
+        # Device profiles from earlier runs, so start_cisco_session() can skip discovery
+        self.device_cache = DeviceCache(cache_path)
         self.sessions = self.get_all_sessions()
         # Sessions loosely represent tabs, although a device can be reassigned to a different tab.
         self.active_session = self.get_active_sessions()
         self.initial_tab = self.crt.GetScriptTab()
+        # Created by start_workers(), for parsing and saving output in the background
+        self.worker_pool = None
 
     def end_sessions(self):
+        if self.worker_pool is not None:
+            self.worker_pool.shutdown()
         for session in self.sessions:
+            session.update_device_cache()
             session.disconnect()
+        self.device_cache.save()
         del self.sessions
         del self.active_session
 
@@ -51,15 +71,16 @@ class CrtSession:
         return self.crt.GetScriptTab()
 
     def get_all_sessions(self):
+        """
+        Creates a Session for every tab. Sessions are cheap handles: tabs aren't activated, and nothing is sent to a
+        device until its session's runner is used.
+        :return: list of Sessions, in tab order
+        """
         session_list = []
-        initial_tab = self.crt.GetScriptTab()
         for i in range(1, self.crt.GetTabCount() + 1):
-            tab = self.crt.GetTab(i)
-            tab.Activate()
-            tab_session = Session(self.crt, tab)
+            tab_session = Session(self.crt, self.crt.GetTab(i), self.device_cache)
             tab_session.tab_index = i
             session_list.append(tab_session)
-        initial_tab.Activate()
         return session_list
 
     def open_new_tab(self):
@@ -107,6 +128,107 @@ class CrtSession:
                 return session
         return None
 
+    def start_workers(self, workers=4, max_pending=None, processes=False):
+        """
+        Starts a WorkerPool, so CPU heavy work like TextFSM parsing and file writes can run in the background while
+        this thread keeps driving SecureCRT. Hand work to it with submit(), and get the results with
+        collect_results().
+        :param workers: the number of worker threads or processes
+        :param max_pending: the most work items waiting or running at once, submit() blocks while this many are
+        :param processes: use processes instead of threads, see WorkerPool
+        :return: the WorkerPool
+        """
+        if self.worker_pool is None:
+            self.worker_pool = WorkerPool(workers, max_pending, processes)
+        return self.worker_pool
+
+    def submit(self, function, *args, **kwargs):
+        """
+        Runs function(*args, **kwargs) on the worker pool, starting one with the defaults if needed.
+        Blocks while the pool already has its maximum of pending work, so output can't pile up faster than it is
+        processed.
+        :return: the number of the work item, its result is at this index in collect_results()
+        """
+        return self.start_workers().submit(function, *args, **kwargs)
+
+    def collect_results(self):
+        """
+        Waits for all work handed to submit() and returns the results, see WorkerPool.collect().
+        """
+        if self.worker_pool is None:
+            return []
+        return self.worker_pool.collect()
+
+    def run_concurrently(self, job, sessions=None, concurrency=10, poll_interval=10, timeout=None, on_done=None):
+        """
+        Runs a job on several tabs at the same time, so the total time is close to that of the slowest device instead
+        of the sum of all of them. Tabs are not activated. Each tab's Screen is polled with short ReadString() calls,
+        and a tab's next command is sent as soon as its previous output is complete.
+
+        The job is a generator function that takes a Session. It yields commands, is sent back each command's
+        output as a list of lines, and returns its result. For example:
+
+            def job(session):
+                version = yield "show version"
+                inventory = yield "show inventory"
+                return version, inventory
+
+        Commands should leave the prompt unchanged, mode-changing commands belong in a runner's methods instead.
+        An exception in one tab's job, or a timeout, only stops that tab.
+        :param job: generator function taking a Session
+        :param sessions: list of Sessions to run the job on, defaults to all sessions
+        :param concurrency: the maximum number of tabs running the job at the same time
+        :param poll_interval: time in milliseconds each ReadString() call waits for output
+        :param timeout: time in seconds a command can go without any output before the tab's job fails, defaults to
+            the runner's response_timeout. Long outputs are fine as long as they keep arriving.
+        :param on_done: function called with each TabJob as soon as it finishes, for example to submit() its result
+            for parsing while the other tabs are still running. An exception in it is logged, and the other tabs
+            keep running.
+        :return: a list of TabJob objects in the same order as sessions, with the result or error of each tab
+        """
+        if sessions is None:
+            sessions = self.sessions
+        tab_jobs = [TabJob(session, job, timeout) for session in sessions]
+        waiting = list(tab_jobs)
+        running = []
+        while waiting or running:
+            while waiting and len(running) < concurrency:
+                tab_job = waiting.pop(0)
+                tab_job.start()
+                if not tab_job.done:
+                    running.append(tab_job)
+            for tab_job in list(running):
+                tab_job.poll(poll_interval)
+                if tab_job.done:
+                    running.remove(tab_job)
+                    if on_done is not None:
+                        try:
+                            on_done(tab_job)
+                        except Exception as e:
+                            # The other tabs are in the middle of their commands, so keep driving them
+                            logging.exception("on_done failed for tab {}: {}".format(tab_job.session.tab_index, e))
+        for tab_job in tab_jobs:
+            if tab_job.error is not None:
+                logging.warning("Job failed on tab {}: {}".format(tab_job.session.tab_index, tab_job.error))
+        return tab_jobs
+
+    def run_commands_concurrently(self, commands, sessions=None, concurrency=10, timeout=None, on_done=None):
+        """
+        Runs the same list of commands on several tabs at the same time, see run_concurrently().
+        :param commands: list of commands that don't change the prompt, like show commands
+        :param sessions: list of Sessions to run the commands on, defaults to all sessions
+        :param concurrency: the maximum number of tabs running commands at the same time
+        :param timeout: time in seconds a command can go without any output
+        :param on_done: function called with each TabJob as soon as it finishes
+        :return: a list of TabJob objects. Each result is a dictionary mapping each command to its output lines.
+        """
+        def job(session):
+            output = {}
+            for command in commands:
+                output[command] = yield command
+            return output
+        return self.run_concurrently(job, sessions, concurrency, timeout=timeout, on_done=on_done)
+
     def message_box(self, message):
         """
         Wrapper for crt.Dialog.MessageBox()
@@ -138,17 +260,273 @@ class CrtSession:
                                               default_filename=default_filename)
 
 
+class DeviceCache:
+    """
+    Remembers what was discovered about each device in a TOML file: the OS, prompt, hostname, model, image version
+    and the terminal settings to restore. start_cisco_session() uses it to skip OS discovery on later runs, as long
+    as the device's live prompt still has the same hostname and the profile isn't older than self.ttl seconds.
+
+    :var self.profiles: dictionary mapping each session's cache key to its device profile
+    """
+
+    default_path = os.path.join(os.path.dirname(os.path.dirname(os.path.realpath(__file__))), "device_cache.toml")
+
+    def __init__(self, path=None, ttl=7 * 24 * 60 * 60):
+        if path is None:
+            path = self.default_path
+        self.path = path
+        self.ttl = ttl
+        self.profiles = self.load()
+        self.changed = False
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            return toml.load(self.path)
+        except Exception as e:
+            logging.warning("Ignoring unreadable device cache {}: {}".format(self.path, e))
+            return {}
+
+    def save(self):
+        """
+        Writes the profiles to self.path, if anything changed since they were loaded.
+        """
+        if not self.changed:
+            return
+        with open(self.path, "w") as cache_file:
+            toml.dump(self.profiles, cache_file)
+        self.changed = False
+
+    def get(self, key, prompt=None):
+        """
+        Returns the cached profile of a device.
+        :param key: the session's cache key, see Session.get_cache_key()
+        :param prompt: the device's live prompt. If given, the cached profile must have the same hostname in it.
+        :return: the profile dictionary, or None if there is no valid profile
+        """
+        profile = self.profiles.get(key)
+        if not profile:
+            return None
+        if time.time() - profile.get("updated", 0) > self.ttl:
+            logging.debug("Device cache entry for {} expired.".format(key))
+            return None
+        if prompt is not None and crt_automation.utilities.prompt_hostname(prompt) != \
+                crt_automation.utilities.prompt_hostname(profile.get("prompt", "")):
+            logging.debug("Device cache entry for {} doesn't match prompt {}.".format(key, prompt))
+            return None
+        return profile
+
+    def set(self, key, profile):
+        profile = dict(profile)
+        profile["updated"] = time.time()
+        self.profiles[key] = profile
+        self.changed = True
+
+    def invalidate(self, key=None):
+        """
+        Forgets the profile of one device, or of all devices if no key is given, and saves the cache.
+        :param key: the session's cache key, see Session.get_cache_key()
+        """
+        if key is None:
+            self.profiles = {}
+        else:
+            self.profiles.pop(key, None)
+        self.changed = True
+        self.save()
+
+
+class WorkerPool:
+    """
+    Runs work in the background for CrtSession.submit(), while the script's own thread drives SecureCRT.
+    The number of pending work items is bounded, so submit() blocks (backpressure) instead of letting captured
+    output pile up in memory. Results are collected in the order the work was submitted.
+
+    Threads are the default. SecureCRT's embedded Python can't always start child processes, since sys.executable is
+    SecureCRT itself, so processes=True is for scripts run by a regular Python interpreter. With processes, the
+    function and its arguments have to be picklable: module-level functions and plain data, not runners or Sessions.
+
+    :var self.futures: the Future of each submitted work item, in submission order
+    :var self.errors: list of (index, exception) tuples for work items that raised an exception
+    """
+
+    def __init__(self, workers=4, max_pending=None, processes=False):
+        if max_pending is None:
+            max_pending = workers * 2
+        if processes:
+            self.executor = concurrent.futures.ProcessPoolExecutor(max_workers=workers)
+        else:
+            self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=workers)
+        self.pending = threading.BoundedSemaphore(max_pending)
+        self.futures = []
+        self.errors = []
+
+    def submit(self, function, *args, **kwargs):
+        """
+        Queues function(*args, **kwargs), waiting first if max_pending work items haven't finished yet.
+        :return: the index of the work item
+        """
+        self.pending.acquire()
+        try:
+            future = self.executor.submit(function, *args, **kwargs)
+        except Exception:
+            self.pending.release()
+            raise
+        future.add_done_callback(lambda done: self.pending.release())
+        self.futures.append(future)
+        return len(self.futures) - 1
+
+    def collect(self):
+        """
+        Waits for every submitted work item and returns their results in submission order. A work item that raised
+        an exception has None as its result, and the exception is logged and added to self.errors.
+        The pool can be used again afterwards.
+        :return: list of results
+        """
+        results = []
+        for index, future in enumerate(self.futures):
+            try:
+                results.append(future.result())
+            except Exception as e:
+                logging.warning("Background work item {} failed: {}".format(index, e))
+                self.errors.append((index, e))
+                results.append(None)
+        self.futures = []
+        return results
+
+    def shutdown(self):
+        self.executor.shutdown(wait=True)
+
+
+class TabJob:
+    """
+    Drives one tab for CrtSession.run_concurrently(), without ever blocking on it for long.
+
+    :var self.session: the Session the job runs on
+    :var self.result: what the job returned, once self.done is True
+    :var self.error: the exception that stopped the job, or None
+    """
+
+    # Sent to discover the prompt the same way CiscoRunner.set_prompt() does
+    probe_string = "\n!&%\b\b\b"
+    probe_marker = "!&%"
+
+    def __init__(self, session, job, timeout=None):
+        self.session = session
+        self.job = job
+        self.timeout = timeout
+        self.generator = None
+        self.command = None
+        self.read_matches = None
+        self.chunks = []
+        self.last_output_time = None
+        self.result = None
+        self.error = None
+        self.done = False
+
+    def start(self):
+        """
+        Starts the job, or the prompt probe if the runner doesn't know its prompt yet.
+        """
+        if not self.session.is_connected():
+            self.finish(error=Exception("Session is not connected."))
+            return
+        runner = self.session.runner
+        if self.timeout is None:
+            self.timeout = runner.response_timeout
+        if not runner.prompt or not getattr(runner, "prompt_valid", True):
+            self.send(None, self.probe_string, [self.probe_marker])
+            return
+        self.advance(None)
+
+    def send(self, command, string, read_matches):
+        self.command = command
+        self.read_matches = read_matches
+        self.chunks = []
+        self.last_output_time = time.monotonic()
+        self.session.screen.Send(string)
+
+    def advance(self, output):
+        """
+        Sends the output of the last command into the job, and sends the command the job yields next.
+        """
+        runner = self.session.runner
+        try:
+            if self.generator is None:
+                self.generator = self.job(self.session)
+                command = next(self.generator)
+            else:
+                command = self.generator.send(output)
+        except StopIteration as stop:
+            self.finish(result=stop.value)
+            return
+        except Exception as e:
+            self.finish(error=e)
+            return
+        self.send(command, command + "\r", [runner.prompt] + runner.get_pager_matches())
+
+    def poll(self, poll_interval):
+        """
+        Reads whatever output the tab has, waiting at most poll_interval milliseconds.
+        """
+        runner = self.session.runner
+        screen = self.session.screen
+        try:
+            chunk = screen.ReadString(self.read_matches, poll_interval, True)
+            match_index = screen.MatchIndex
+            if match_index == 0:
+                self.chunks.append(chunk)
+                if chunk:
+                    self.last_output_time = time.monotonic()
+                elif time.monotonic() - self.last_output_time > self.timeout:
+                    if hasattr(runner, "invalidate_prompt"):
+                        runner.invalidate_prompt()
+                    raise Exception("Timeout trying to capture output of '{}'".format(self.command))
+                return
+            if self.command is None:
+                # The prompt probe came back
+                prompt = (''.join(self.chunks) + chunk).replace("\r", "\n").split("\n")[-1].strip("\b ")
+                if hasattr(runner, "update_prompt"):
+                    runner.update_prompt(prompt)
+                else:
+                    runner.prompt = prompt
+                self.advance(None)
+                return
+            # Leave out the partial line in front of the prompt or pager prompt, like "bulk" capture mode does.
+            self.chunks.append(chunk[:max(chunk.rfind("\n"), chunk.rfind("\r")) + 1])
+            if match_index > 1:
+                # We got a pager prompt, send a space character for the next page
+                screen.Send(" ")
+                return
+            output = ''.join(self.chunks)
+            # Leave out the echo of the command
+            echo_index = output.find(self.command)
+            if echo_index >= 0:
+                output = output[echo_index + len(self.command):]
+            self.advance(list(runner.split_output(output)))
+        except Exception as e:
+            self.finish(error=e)
+
+    def finish(self, result=None, error=None):
+        self.result = result
+        self.error = error
+        self.done = True
+        if self.generator is not None and error is not None:
+            self.generator.close()
+
+
 class Session:
-    def __init__(self, crt, tab):
+    def __init__(self, crt, tab, device_cache=None):
         self.crt = crt
         self.tab = tab
+        self.device_cache = device_cache
         self.screen = tab.Screen
         self.session = tab.Session
         self.script = None
         self.os = None
         self.host = tab.Caption
-        # TODO - don't set this to a Cisco runner, in case we are working with bash.
-        self.runner = CiscoRunner(self.crt, tab)
+        # Created the first time self.runner is used, see the runner property
+        self._runner = None
         self.remote_ip = "0.0.0.0"
         self.enable_pass = ''
         self.username = ''
@@ -160,9 +538,60 @@ class Session:
         self.term_width = None
         self.logger = logging.getLogger()
 
+    @property
+    def runner(self):
+        """
+        The runner for this tab, created the first time it's used. It doesn't probe the device for its prompt until
+        a command needs it. Until start_cisco_session() or start_linux_session() picks a runner for the device's OS,
+        this is a plain CiscoRunner.
+        """
+        if self._runner is None:
+            self._runner = CiscoRunner(self.crt, self.tab)
+        return self._runner
+
+    @runner.setter
+    def runner(self, runner):
+        self._runner = runner
+
     def set_os(self):
         pass
 
+    def get_cache_key(self):
+        """
+        Returns the key of this session's device in the device cache: the saved session path if there is one,
+        otherwise the remote address, otherwise the tab's caption.
+        """
+        for attribute in ("Path", "RemoteAddress"):
+            try:
+                value = getattr(self.session, attribute)
+            except Exception:
+                value = None
+            if value:
+                return str(value)
+        return self.host
+
+    def get_profile(self):
+        """
+        Returns what is known about the device, as stored in the device cache.
+        """
+        runner = self.runner
+        profile = {"os": self.os, "prompt": runner.prompt}
+        profile["hostname"] = runner.hostname or crt_automation.utilities.prompt_hostname(runner.prompt or "")
+        for attribute in ("model", "image_version"):
+            if getattr(runner, attribute, None):
+                profile[attribute] = getattr(runner, attribute)
+        if getattr(runner, "terminal_restore_commands", None) is not None:
+            profile["terminal_restore"] = runner.terminal_restore_commands
+        return profile
+
+    def update_device_cache(self):
+        """
+        Stores this session's device profile in the device cache, if the OS was discovered.
+        """
+        if self.device_cache is None or self.os not in cisco_os_runners or not self.runner.prompt:
+            return
+        self.device_cache.set(self.get_cache_key(), self.get_profile())
+
     def set_name(self):
         pass
 
@@ -192,6 +621,11 @@ class Session:
             return
 
     def disconnect(self):
+        if isinstance(self._runner, CiscoRunner) and self.is_connected():
+            try:
+                self.runner.restore_terminal_profile()
+            except Exception as e:
+                self.logger.debug("Could not restore terminal settings: {}".format(e))
         self.screen.Synchronous = False
         self.screen.IgnoreEscape = False
         try:
@@ -212,15 +646,17 @@ class Session:
     def validate_os(self, os_list, raise_exception=True):
         """
         Check this device's OS against a list of OS's to verify a script's compatibility.
+        If the OS hasn't been discovered yet, start_cisco_session() or start_linux_session() discovers it first.
         :param os_list: A list of compatible OS's. Valid options: Linux, IOS, XE, NXOS, XR, ASA, WAAS. Case insensitive.
         :param raise_exception: If this flag is True, an exception is raised.
         :return: True bool if OS was found in list, otherwise False
         """
-        if not self.runner:
-            if raise_exception:
-                raise Exception("You need to run start_session() or "
-                                "start_cisco_session() before running validate_os().")
-            return False
+        if not self.os and self.is_connected():
+            # Discover the OS the first time it's needed
+            if all(os.lower() == "linux" for os in os_list):
+                self.start_linux_session()
+            else:
+                self.start_cisco_session()
         if not self.os:
             if raise_exception:
                 raise Exception("Could not find self.device_type")
@@ -285,9 +721,12 @@ class Session:
         if result == 4:  # If password is still incorrect after max attempts reached:
             raise Exception("Failed to login!")
 
-    def start_cisco_session(self, attempt_login=True, enable_pass=None, timeout=5):
+    def start_cisco_session(self, attempt_login=True, enable_pass=None, timeout=5, terminal_profile=True,
+                            use_cache=True):
         """
         Discovers the Cisco OS, sets self.runner to an instance of a runner class, and sets the prompt.
+        :param terminal_profile: if True, turns off paging and line wrapping until end_sessions() restores them
+        :param use_cache: if True, a device profile from an earlier run replaces OS discovery
         :return:
         """
         if not self.is_connected():
@@ -311,25 +750,34 @@ class Session:
         # TODO - code for enable passwords, usernames and passwords
 
         # Use this runner until we discover the network OS type
-        temp_runner = runners.CiscoRunner(self.crt, self.tab)
+        temp_runner = self.runner
 
         if attempt_login:
             self.attempt_login(temp_runner)
 
         # Discover the prompt so we can parse output
-        temp_runner.set_prompt()
+        temp_runner.ensure_prompt()
 
+        # send() reads the new prompt after mode-changing commands, so we only probe again if that failed.
         if ">" in temp_runner.prompt:  # enter priv exec from user exec
-            temp_runner.send("en \r")
-            temp_runner.current_tab.Screen.WaitForString("en", timeout)
-            temp_runner.set_prompt()
+            temp_runner.send("en \r", timeout=timeout)
+            temp_runner.ensure_prompt()
         while ")#" in temp_runner.prompt:  # exit configuration modes
-            temp_runner.send("exit \r")
-            temp_runner.current_tab.Screen.WaitForString("exit", timeout)
-            temp_runner.set_prompt()
-
+            temp_runner.send("exit \r", timeout=timeout)
+            temp_runner.ensure_prompt()
+
+        cached_profile = None
+        if use_cache and self.device_cache is not None:
+            cached_profile = self.device_cache.get(self.get_cache_key(), temp_runner.prompt)
+
+        if cached_profile and cached_profile.get("os") in cisco_os_runners:
+            self.os = cached_profile["os"]
+            self.runner = cisco_os_runners[self.os](self.crt, self.tab)
+            for attribute in ("hostname", "model", "image_version"):
+                setattr(self.runner, attribute, cached_profile.get(attribute))
+            logging.info("Using cached device profile for {}".format(self.get_cache_key()))
         # Check for ROMMON:
-        if temp_runner.prompt in temp_runner.rommon_prompts:
+        elif temp_runner.prompt in temp_runner.rommon_prompts:
             temp_runner.send("help\r")
             result = temp_runner.send_wait_for_strings("help\r", ["boot", "Invalid"])
             if result == 0:
@@ -368,5 +816,19 @@ class Session:
                 self.runner = runners.cisco.WAAS(self.crt, self.tab)
                 self.os = "WAAS"
 
+        if self.runner is not temp_runner and isinstance(self.runner, CiscoRunner):
+            # The new runner starts with the prompt we already know, instead of probing for it again.
+            self.runner.update_prompt(temp_runner.prompt)
+
         logging.info("OS class is {}".format(self.runner.__str__()))
 
+        if terminal_profile and isinstance(self.runner, CiscoRunner):
+            restore_commands = None
+            if cached_profile:
+                restore_commands = cached_profile.get("terminal_restore")
+            self.runner.apply_terminal_profile(restore_commands)
+
+        if not cached_profile and self.device_cache is not None:
+            self.update_device_cache()
+            self.device_cache.save()
+
@@ -0,0 +1,230 @@
+# $language = "Python3"
+# $interface = "1.0"
+
+# Loads the TextFSM templates in textfsm_templates/ once per SecureCRT script, instead of once per parse.
+# Templates are picked from the runner class and command through textfsm_templates/index.
+
+import io
+import os
+import re
+import logging
+import threading
+import textfsm
+
+logger = logging.getLogger()
+
+default_template_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.realpath(__file__))), "textfsm_templates")
+
+
+def command_regex(command):
+    """
+    Turns a command from the index file into a regular expression. Like TextFSM's clitable, "sh[[ow]]" matches
+    "sh", "sho" and "show".
+    :param command: a command with abbreviation brackets, like "sh[[ow]] cdp ne[[ighbors]]"
+    :return: compiled regular expression that matches the whole command
+    """
+    def optional(match):
+        # "ow" becomes "(o(w)?)?"
+        characters = match.group(1)
+        return "".join("({}".format(re.escape(character)) for character in characters) + ")?" * len(characters)
+
+    words = []
+    for word in command.split():
+        words.append(re.sub(r"\[\[(.+?)\]\]", optional, word))
+    return re.compile(r"^\s*" + r"\s+".join(words) + r"\s*$", re.IGNORECASE)
+
+
+class TemplateRegistry:
+    """
+    Keeps one compiled TextFSM object per template as a prototype, and hands out cheap copies of it for each parse.
+    Templates are chosen from the platform (the runner's class name, like "XE" or "NXOS") and the command, with the
+    rows of the index file. The first row whose Platform and Command regular expressions match is used.
+
+    :var self.template_dir: the folder with the templates and the index file
+    :var self.index: list of (template file name, platform regex, command regex) tuples from the index file
+    :var self.prototypes: dictionary mapping template paths to compiled TextFSM objects. They are only ever copied.
+    :var self.lookups: dictionary mapping (platform, command) to the template find_template() chose
+    :var self.lock: guards filling self.index, self.lookups and self.prototypes, since parses run on worker threads
+    """
+
+    def __init__(self, template_dir=None, index_file="index"):
+        if template_dir is None:
+            template_dir = default_template_dir
+        self.template_dir = template_dir
+        self.index_file = os.path.join(template_dir, index_file)
+        self.index = None
+        self.prototypes = {}
+        self.lookups = {}
+        # Parses can happen on worker threads, see CrtSession's worker pool
+        self.lock = threading.Lock()
+
+    def load_index(self):
+        """
+        Reads the index file. Each row is "Template, Platform, Command". Lines starting with "#" are comments, and
+        the first other row is the header.
+        """
+        index = []
+        if os.path.exists(self.index_file):
+            with open(self.index_file, "r") as index_file:
+                header_seen = False
+                for line in index_file:
+                    line = line.strip()
+                    if not line or line.startswith("#"):
+                        continue
+                    if not header_seen:
+                        header_seen = True
+                        continue
+                    template, platform, command = [column.strip() for column in line.split(",", 2)]
+                    index.append((template, re.compile(r"^({})$".format(platform)), command_regex(command)))
+        else:
+            logger.warning("<TemplateRegistry.load_index> No index file at {}".format(self.index_file))
+        self.index = index
+        return index
+
+    def find_template(self, platform, command):
+        """
+        Selects a template for a command.
+        :param platform: the runner's class name, like "XE", "NXOS" or "AireOS"
+        :param command: the command, like "sh cdp neigh det"
+        :return: the template's file name, or None if no row of the index matches
+        """
+        key = (platform, " ".join(command.split()))
+        if key in self.lookups:
+            return self.lookups[key]
+        # Worker threads can miss at the same time, so the index is loaded and the lookup stored by one at a time
+        with self.lock:
+            if key in self.lookups:
+                return self.lookups[key]
+            if self.index is None:
+                self.load_index()
+            template = None
+            for template_name, platform_regex, regex in self.index:
+                if platform_regex.match(platform) and regex.match(command):
+                    template = template_name
+                    break
+            self.lookups[key] = template
+        logger.debug("<TemplateRegistry.find_template> {} '{}' uses template {}".format(platform, command, template))
+        return template
+
+    def get_prototype(self, template):
+        """
+        Returns the compiled TextFSM object for a template, compiling it the first time.
+        :param template: a file name in self.template_dir, or a path to a template file
+        """
+        path = os.path.realpath(os.path.join(self.template_dir, template))
+        prototype = self.prototypes.get(path)
+        if prototype is None:
+            with self.lock:
+                prototype = self.prototypes.get(path)
+                if prototype is None:
+                    logger.debug("<TemplateRegistry.get_prototype> Compiling template {}".format(path))
+                    with open(path, "r") as template_file:
+                        prototype = textfsm.TextFSM(io.StringIO(template_file.read()))
+                    self.prototypes[path] = prototype
+        return prototype
+
+    def get_fsm(self, template):
+        """
+        Returns a TextFSM object for one parse. It shares the compiled states of the prototype and only copies the
+        values, which hold the state of a parse. That is several times faster than compiling the template again.
+        :param template: a file name in self.template_dir, or a path to a template file
+        :return: a TextFSM object ready to parse
+        """
+        prototype = self.get_prototype(template)
+        fsm = self.copy_object(prototype)
+        fsm.values = []
+        for value in prototype.values:
+            new_value = self.copy_object(value)
+            new_value.fsm = fsm
+            new_value.options = []
+            for option in value.options:
+                new_option = self.copy_object(option)
+                new_option.value = new_value
+                new_value.options.append(new_option)
+            fsm.values.append(new_value)
+        # Reset() gives the copies their own results, current state and option state.
+        fsm.Reset()
+        return fsm
+
+    def copy_object(self, original):
+        copy = object.__new__(type(original))
+        copy.__dict__.update(original.__dict__)
+        return copy
+
+    def parse(self, output, template=None, platform=None, command=None, as_dict=True):
+        """
+        Parses command output with a template, or with the template the index file selects for platform and command.
+        :param output: the command output, as a string or a list of lines
+        :param template: a file name in self.template_dir, or a path to a template file
+        :param platform: the runner's class name, if no template is given
+        :param command: the command that produced output, if no template is given
+        :param as_dict: return dictionaries mapping TextFSM value names to values, instead of lists
+        :return: list of parsed records
+        """
+        if template is None:
+            template = self.find_template(platform, command)
+            if template is None:
+                raise Exception("No TextFSM template for '{}' on {}".format(command, platform))
+        if not isinstance(output, str):
+            output = "\n".join(output)
+        fsm = self.get_fsm(template)
+        records = fsm.ParseText(output)
+        logger.debug("<TemplateRegistry.parse> {} returned {} records.".format(template, len(records)))
+        if as_dict:
+            return [dict(zip(fsm.header, record)) for record in records]
+        return records
+
+    def iter_parse(self, lines, template=None, platform=None, command=None, as_dict=True):
+        """
+        Same as parse(), but takes the output one line at a time and yields each record as soon as a Record action
+        creates it. Lines can come straight from CiscoRunner.iter_command_output(), so parsing happens while the
+        output is still being read, and only the current record is held in memory.
+        Templates with Fillup values change records that were already created, so for those the records are only
+        yielded once all lines have been parsed.
+        :param lines: iterable of output lines
+        :param template: a file name in self.template_dir, or a path to a template file
+        :param platform: the runner's class name, if no template is given
+        :param command: the command that produced the lines, if no template is given
+        :param as_dict: yield dictionaries mapping TextFSM value names to values, instead of lists
+        :return: generator of parsed records
+        """
+        if template is None:
+            template = self.find_template(platform, command)
+            if template is None:
+                raise Exception("No TextFSM template for '{}' on {}".format(command, platform))
+        fsm = self.get_fsm(template)
+        header = fsm.header
+        streaming = not any("Fillup" in value.OptionNames() for value in fsm.values)
+        record_count = 0
+        for line in lines:
+            # With eof=False, ParseText() keeps its state between calls and returns every record created so far.
+            # The newline keeps blank lines, which ParseText() would otherwise skip.
+            records = fsm.ParseText(line + "\n", eof=False)
+            if streaming and records:
+                for record in records:
+                    record_count += 1
+                    yield dict(zip(header, record)) if as_dict else record
+                del records[:]
+            if fsm._cur_state_name in ("End", "EOF"):
+                break
+        # An empty parse with eof=True runs the template's EOF handling, which usually records the last entry.
+        for record in fsm.ParseText("", eof=True):
+            record_count += 1
+            yield dict(zip(header, record)) if as_dict else record
+        logger.debug("<TemplateRegistry.iter_parse> {} returned {} records.".format(template, record_count))
+
+
+default_registry = None
+default_registry_lock = threading.Lock()
+
+
+def get_registry():
+    """
+    Returns the TemplateRegistry for textfsm_templates/, shared by all runners so each template is compiled once.
+    """
+    global default_registry
+    if default_registry is None:
+        with default_registry_lock:
+            if default_registry is None:
+                default_registry = TemplateRegistry()
+    return default_registry
@@ -5,38 +5,16 @@ import re
 import socket
 import struct
 import logging
-import textfsm
+import crt_automation.textfsm_registry
+import crt_automation.interfaces
 
 logger = logging.getLogger()
 
 # Enter one of the most convoluted regular expressions I've ever worked with:
 interface_regex = r"\w+(-\w+)?\d+(([\/:]\d+)+(\.\d+)?)?"
 
-replace_pairs = [
-    ("Ce", "Cellular"),
-    ("Eth", "Ethernet"),
-    ("Et", "FastEthernet"),
-    ("Gi", "GigabitEthernet"),
-    ("GE", "GigabitEthernet"),
-    ("Te", "TenGigabit"),
-    ("Se", "Serial"),
-    ("AT", "ATM"),
-    ("Po", "Port-channel"),
-    ("PortCh", "Port-channel"),
-    ("Tu", "Tunnel"),
-    ("Lo", "Loopback"),
-    ("NV", "NVI"),
-    ("FD", "Fddi"),
-    ("Vl", "Vlan"),
-    ("EO", "EOBC"),
-    ("Vi", "Virtual-Access"),
-    ("Vt", "Virtual-Template"),
-    ("In", "Internal-Data"),
-    ("Async", "Async"),
-    ("Group-Async", "Group-Async"),
-    ("mgmt", "mgmt"),
-    ("Ma", "Management")
-]
+# (abbreviation, long name) pairs, now kept with the rest of the interface name tables
+replace_pairs = crt_automation.interfaces.replace_pairs
 
 
 def intf_regex(any_string):
@@ -52,6 +30,16 @@ def intf_regex(any_string):
     return results
 
 
+def extract_intf_names(any_string):
+    """
+    Finds the interface names in command output, unlike intf_regex() without IP addresses or repeats, and expanded
+    to their long names. See crt_automation.interfaces.InterfaceExtractor.
+    :param any_string: Multiline string, or a list of lines
+    :return: list of interface names, in the order they were first found
+    """
+    return list(crt_automation.interfaces.InterfaceExtractor().extract(any_string))
+
+
 def long_int_from_int_list(short_name, int_list):
     """
     Returns the canonical interface name for an abbreviated form.
@@ -60,6 +48,10 @@ def long_int_from_int_list(short_name, int_list):
     :param int_list: a list of interface names from the disco device
     :return:
     """
+    # Exact matches are a single dictionary lookup, the index is built once per interface list.
+    interface = get_interface_index(int_list).lookup(short_name)
+    if interface is not None:
+        return interface
     num_regex = r'[\d\/]{1,}'
     short_intf_nums = re.search(num_regex, short_name).group()
     short_intf_word = re.split(num_regex, short_name)[0]
@@ -72,18 +64,28 @@ def long_int_from_int_list(short_name, int_list):
     return None
 
 
+def get_interface_index(int_list):
+    """
+    Returns an InterfaceIndex for a list of interface names, reusing the last one built for the same list.
+    :param int_list: a list of interface names from the device
+    """
+    global last_interface_index
+    key = tuple(int_list)
+    if last_interface_index is None or last_interface_index[0] != key:
+        last_interface_index = (key, crt_automation.interfaces.InterfaceIndex(key))
+    return last_interface_index[1]
+
+
+last_interface_index = None
+
+
 def short_int_name(long_name):
     """
     This function shortens the interface name for easier reading
     :param long_name:  The input string (long interface name)
     :return:  The shortened interface name
     """
-    lower_str = long_name.lower()
-    for pair in replace_pairs:
-        if pair[1] in lower_str:
-            return lower_str.replace(pair[1], pair[0])
-    else:
-        return long_name
+    return crt_automation.interfaces.default_interface_names.short_name(long_name)
 
 
 def long_int_name(short_name):
@@ -92,11 +94,7 @@ def long_int_name(short_name):
     :param short_name:  The input string (short interface name)
     :return:  The shortened interface name
     """
-    for pair in replace_pairs:
-        if re.match("{0}\d".format(pair[0]), short_name, re.IGNORECASE):
-            return short_name.replace(pair[0], pair[1])
-    else:
-        return short_name
+    return crt_automation.interfaces.default_interface_names.long_name(short_name)
 
 
 def expand_number_range(num_string):
@@ -106,34 +104,36 @@ def expand_number_range(num_string):
     :param num_string: <str> A string that is in the format of a number range (e.g. 1,3,5-7)
     :return: <list> A list of all integers in that range (e.g. [1,3,5,6,7])
     """
-    num_string = num_string.strip()
-    temp = [(lambda sub: range(sub[0], sub[-1] + 1))(list(map(int, ele.split('-')))) for ele in num_string.split(',')]
-    output_list = [b for a in temp for b in a]
-    return output_list
+    return list(crt_automation.interfaces.iter_number_range(num_string.strip()))
 
 
 def expand_int_range(int_range):
     """
-    Returns a list of individual interfaces from an interface range
+    Returns a list of individual interfaces from an interface range, like "Gi1/0/1-48,Te1/1/1-4"
+    Use crt_automation.interfaces.iter_interface_range() to expand large ranges lazily.
     :param int_range:
     :return:
     """
-    int_range = int_range.strip()
-    int_name = re.split('[^a-zA-Z]', int_range.strip())[0]
-    num_range = int_range.split(int_name)[1]
-    linecard_nums = ''
-    if '/' in num_range:
-        # rsplit delimits by last '/' in string:
-        linecard_nums = num_range.rsplit('/', 1)[0] + '/'
-        print(linecard_nums)
-        num_range = num_range.rsplit('/', 1)[1]
-    print(num_range)
-    nums = expand_number_range(num_range)
-    output_list = []
-    for num in nums:
-        interface = int_name + linecard_nums + str(num)
-        output_list.append(long_int_name(interface))
-    return output_list
+    return list(crt_automation.interfaces.iter_interface_range(int_range.strip()))
+
+
+def compact_int_range(interfaces, os_name=None):
+    """
+    The opposite of expand_int_range(): turns a list of interfaces into as few interface ranges as possible
+    :param interfaces: list of interface names
+    :param os_name: a runner class name like "XE" or "NXOS", for the limits of its "interface range" command
+    :return: list of interface ranges, like ["Gi1/0/1 - 48, Te1/1/1 - 4"]
+    """
+    return crt_automation.interfaces.compact_interfaces(interfaces, crt_automation.interfaces.get_range_format(os_name))
+
+
+def prompt_hostname(prompt):
+    """
+    Returns the hostname part of a Cisco prompt, without the mode
+    :param prompt: a prompt like "Router(config-if)#" or "Switch>"
+    :return: the hostname, like "Router"
+    """
+    return re.sub(r"\(.*\)$", "", prompt.strip().rstrip("#>").rstrip())
 
 
 def os_regex(show_ver_output):
@@ -163,10 +163,9 @@ def textfsm_parse_to_list(input_data, template_name, add_header=False):
     """
 
     logger.debug("Preparing to process with TextFSM and return a list of lists")
-    # Create file object to the TextFSM template and create TextFSM object.
+    # The template is compiled once by the registry, this is a fresh copy of it.
     logger.debug("Using template at: {0}".format(template_name))
-    with open(template_name, 'r') as template:
-        fsm_table = textfsm.TextFSM(template)
+    fsm_table = crt_automation.textfsm_registry.get_registry().get_fsm(template_name)
 
     # Process our raw data vs the template with TextFSM
     output = fsm_table.ParseText(input_data)
@@ -190,10 +189,9 @@ def textfsm_parse_to_dict(input_data, template_filename):
     """
 
     logger.debug("Preparing to process with TextFSM and return a list of dictionaries.")
-    # Create file object to the TextFSM template and create TextFSM object.
+    # The template is compiled once by the registry, this is a fresh copy of it.
     logger.debug("Using template at: {0}".format(template_filename))
-    with open(template_filename, 'r') as template:
-        fsm_table = textfsm.TextFSM(template)
+    fsm_table = crt_automation.textfsm_registry.get_registry().get_fsm(template_filename)
 
     # Process our raw data vs the template with TextFSM
     fsm_list = fsm_table.ParseText(input_data)
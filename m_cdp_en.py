@@ -38,8 +38,7 @@ def main():
         nos.priv_exec()
         interfaces = nos.get_intf_names()
         nos.enable_cdp_global()
-        for intf in interfaces:
-            nos.enable_cdp_intf(intf)
+        nos.configure_interfaces(interfaces, nos.get_cdp_intf_commands())
         nos.priv_exec()
         nos.set_prompt()
         nos.save_changes()
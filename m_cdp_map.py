@@ -21,7 +21,6 @@ else:
 # Local import
 import runners
 from crt_automation.sessions import CrtSession
-import crt_automation.utilities
 
 
 # Main function and script logic here:
@@ -29,7 +28,6 @@ def main():
     scrt = CrtSession(crt)
 
     cdp_file = os.path.join(script_dir, 'cdp_map.txt')
-    cdp_template = os.path.join(script_dir, 'textfsm_templates', 'cisco_os_show_cdp_neigh_det.template')
 
     for session in scrt.sessions:
         session.focus_tab()
@@ -38,15 +36,31 @@ def main():
         # Raise exception if script is running on an incompatible OS
         session.validate_os(["IOS", "XE", "NXOS", "ASA", "WAAS"])
 
-        nos = session.runner
+        session.runner.priv_exec()
 
-        nos.priv_exec()
+    cdp_command = "show cdp neighbors detail"
 
-        cdp_output = nos.write_output_to_file("show cdp neighbors detail", cdp_file)
+    def parse_cdp(tab_job):
+        # Runs on a worker thread, while the other tabs are still being read.
+        nos = tab_job.session.runner
+        cdp_output = nos.prompt + cdp_command + '\r' + '\n'.join(tab_job.result[cdp_command])
+        # The TextFSM template is chosen for the runner's OS and the command, see textfsm_templates/index
+        fsm_results = nos.parse(cdp_command, tab_job.result[cdp_command])
+        return nos, cdp_output, fsm_results
 
-        # Choose the TextFSM template and process the data
-        fsm_results = crt_automation.utilities.textfsm_parse_to_dict(cdp_output, cdp_template)
+    def on_done(tab_job):
+        if tab_job.error is None:
+            scrt.submit(parse_cdp, tab_job)
 
+    # Runs the command on all tabs at the same time, instead of one tab after another.
+    scrt.run_commands_concurrently([cdp_command], on_done=on_done)
+
+    # The file is written from this thread, in the order the tabs finished.
+    for result in scrt.collect_results():
+        if result is None:
+            continue
+        nos, cdp_output, fsm_results = result
+        nos.str_to_file(cdp_output, cdp_file)
         nos.str_to_file(str(fsm_results), cdp_file)
 
     os.startfile(cdp_file)
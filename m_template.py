@@ -16,10 +16,6 @@
 
 import os
 import sys
-# A great module for parsing Cisco configs.
-# Examples: https://github.com/mpenning/ciscoconfparse/tree/master/examples
-from ciscoconfparse import CiscoConfParse
-
 # Avoids errors in IDE's that can't detect the crt variable:
 global crt
 
@@ -65,7 +61,7 @@ def main():
         mgmt_vrf = runner.get_mgmt_vrf()
         host = runner.get_hostname()
 
-        # Get a list of interface names. We could do this with CiscoConfParse too, technically.
+        # Get a list of interface names, from the running-config model shared by the runner's methods.
         names = runner.get_intf_names()
 
         # Convert interface abbreviation: Gi0 --> GigabitEthernet0
@@ -87,12 +83,10 @@ def main():
         # copy run start
         runner.save_changes()
 
-        sh_run_output = session.runner.get_command_output("sh run | b interface")
-
-        # Let's try using CiscoConfParse now!
-        parse = CiscoConfParse(sh_run_output)
+        # The running-config is parsed once and indexed, so queries like this don't parse it again.
+        config = runner.get_config_model()
         # Return a list of all active interfaces (i.e. not shutdown)
-        active_intfs = parse.find_objects_wo_child(r"^interf", r"shutdown")
+        active_intfs = config.without_child("interface", "shutdown")
 
     return
 
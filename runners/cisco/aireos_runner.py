@@ -11,6 +11,17 @@ class AireOS(CiscoRunner):
                              'Press Enter to continue...',
                              'Press Enter to continue or <[Cc]trl-[Zz]> to abort',
                              '--More or (q)uit current module or <[Cc]trl-[Zz]> to abort', '--More-- or (q)uit']
+        # AireOS doesn't have IOS style configuration modes, so there are no mode commands to plan.
+        self.mode_transitions = {}
+        # AireOS can't show the paging setting, so paging is simply turned back on afterwards.
+        self.terminal_profile = {
+            "show": None,
+            "apply": ["config paging disable"],
+            "restore": [(None, "config paging enable")]
+        }
+        # No way to show part of the configuration, get_config_sections() parses the whole thing.
+        self.section_commands = {}
+        self.change_marker_commands = {}
 
     def __str__(self):
         return '<Class: AireOS>'
\ No newline at end of file
@@ -1,13 +1,39 @@
 # $language = "Python3"
 # $interface = "1.0"
 
+import re
 from runners.cisco.cisco_runner import CiscoRunner
 
+# The ASA has no VRFs or "| section", but "show running-config" takes the section to show as an argument.
+asa_section_commands = {
+    "interface": ("show running-config interface", "show running-config interface {name}"),
+    "router": ("show running-config router", None),
+    "acl": ("show running-config access-list", "show running-config access-list {name}")
+}
+
+# The ASA computes a checksum of the running-config, and saves it at the end of the startup-config.
+asa_change_marker_commands = {
+    "running": ("show checksum", r"Cryptochecksum:"),
+    "startup": ("show startup-config | include Cryptochecksum", r"Cryptochecksum:")
+}
+
+# The ASA starts its errors with "ERROR:", like "ERROR: % Invalid input detected at '^' marker."
+asa_config_error_markers = ["ERROR:", "% Invalid input", "% Incomplete command", "% Ambiguous command"]
+
 
 class ASA(CiscoRunner):
     def __init__(self, crt, current_tab):
         CiscoRunner.__init__(self, crt, current_tab)
         self.line_matches = ["\r\n", '\r', '\n', '<--- More --->']
+        # "terminal pager" only changes the current session, unlike "pager lines" in the configuration.
+        self.terminal_profile = {
+            "show": "show pager",
+            "apply": ["terminal pager 0"],
+            "restore": [(r"pager lines (\d+)", "terminal pager {}")]
+        }
+        self.section_commands = asa_section_commands
+        self.change_marker_commands = asa_change_marker_commands
+        self.config_error_markers = asa_config_error_markers
 
     def __str__(self):
         return '<Class: ASA>'
@@ -16,6 +42,21 @@ class ASA(CiscoRunner):
         self.priv_exec()
         return self.get_command_output("sh int ip br")
 
-    def save_changes(self):
+    def has_unsaved_changes(self):
+        """
+        Compares the running-config's checksum from "show checksum" with the Cryptochecksum saved at the end of the
+        startup-config.
+        :return: True or False, or None if the device doesn't tell
+        """
+        checksums = []
+        for command in ("show checksum", "show startup-config | include Cryptochecksum"):
+            output = " ".join(self.get_command_output(command, cache=False))
+            match = re.search(r"Cryptochecksum:\s*([0-9a-fA-F ]+)", output)
+            if match is None:
+                return None
+            checksums.append("".join(match.group(1).split()).lower())
+        return checksums[0] != checksums[1]
+
+    def write_config(self):
         self.send("copy run start \r", "running-config")
         self.send("\r")
\ No newline at end of file
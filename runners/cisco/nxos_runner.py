@@ -1,13 +1,59 @@
 # $language = "Python3"
 # $interface = "1.0"
 
+import re
 from runners.cisco.cisco_runner import CiscoRunner
 
+# NX-OS logs straight into Privileged EXEC, there is no User EXEC mode to move to.
+nxos_mode_transitions = {
+    "Privileged EXEC": {"Global Configuration": "configure terminal"},
+    "Global Configuration": {"Privileged EXEC": "end",
+                             "Interface": "interface {interface}"},
+    "Interface": {"Privileged EXEC": "end",
+                  "Global Configuration": "exit",
+                  "Interface": "interface {interface}"},
+    "Routing Engine": {"Privileged EXEC": "end",
+                       "Global Configuration": "exit",
+                       "Interface": "interface {interface}"},
+    "Line": {"Privileged EXEC": "end",
+             "Global Configuration": "exit"},
+    "Configuration Submode": {"Privileged EXEC": "end",
+                              "Global Configuration": "exit",
+                              "Interface": "interface {interface}"}
+}
+
+
+nxos_section_commands = {
+    "interface": ("show running-config interface", "show running-config interface {name}"),
+    "router": ("show running-config | section ^router", "show running-config | section '^router {name}$'"),
+    "vrf": ("show running-config | section ^vrf", "show running-config | section '^vrf context {name}$'"),
+    "line": ("show running-config | section ^line", None),
+    "acl": ("show running-config aclmgr", None)
+}
+
+
+# NX-OS 7 and later write when the configuration last changed and was saved into the configuration's header, next to
+# "!Time:", the time the output was made. "!Time:" is only used when the other line is missing, on older versions,
+# and then the marker changes every time and the configuration is always fetched.
+nxos_change_marker_commands = {
+    "running": ("show running-config | include \"Time|last done\"",
+                [r"^!\s*Running configuration last done at", r"^!\s*Time:"]),
+    "startup": ("show startup-config | include \"Time|saved at\"", [r"^!\s*Startup config saved at", r"^!\s*Time:"])
+}
+
+# How NX-OS reports configuration lines it didn't accept, see CiscoRunner.send_config_lines()
+nxos_config_error_markers = ["% Invalid command", "% Invalid range", "% Invalid number", "% Incomplete command",
+                             "% Ambiguous command", "% Invalid input", "ERROR:"]
+
 
 class NXOS(CiscoRunner):
     def __init__(self, crt, current_tab):
         CiscoRunner.__init__(self, crt, current_tab)
         self.line_matches = ["\r\n", '\r', '\n', '--More--']
+        self.mode_transitions = nxos_mode_transitions
+        self.section_commands = nxos_section_commands
+        self.change_marker_commands = nxos_change_marker_commands
+        self.config_error_markers = nxos_config_error_markers
 
     def __str__(self):
         return '<Class: NXOS>'
@@ -16,24 +62,28 @@ class NXOS(CiscoRunner):
         self.global_config()
         self.send("cdp enable \r")
 
-    def enable_cdp_intf(self, interface):
-        if not "(config-if)" in self.prompt:
-            self.goto_intf_config(interface)
-        self.send("cdp enable \r")
-        self.send("no shut \r")
-
     def show_intf_brief(self):
         self.priv_exec()
         return self.get_command_output("sh int br")
 
-    def save_changes(self):
+    def has_unsaved_changes(self):
+        """
+        Asks the device whether the running-config differs from the startup-config, with "show running-config diff".
+        :return: True or False, or None if the device doesn't tell
+        """
+        output = self.get_command_output("show running-config diff", cache=False)
+        if any("% Invalid" in line for line in output):
+            return None
+        # Changed lines start with "+ ", "- " or "! ", like a context diff
+        return any(re.match(r"^[-+!] ", line) for line in output)
+
+    def write_config(self):
         """
-        Sends "copy run start" or equivalents with boilerplate code for different OS's like XE, XR, etc.
-        :return:
+        Sends "copy run start". Use save_changes() to only save when something changed.
         """
-        # TODO - write a version of this function for the XR class
         # NXOS shows lots of '#' when saving the running-config, which screws with set_prompt.
         # Thus, we need to avoid self.send() which calls set_prompt()
+        self.invalidate_output_cache()
         self.current_tab.Screen.Send("copy run start \r")
         self.current_tab.Screen.WaitForString("Copy complete.", 10)
         self.send("\r")
@@ -8,6 +8,14 @@ class WAAS(CiscoRunner):
     def __init__(self, crt, current_tab):
         CiscoRunner.__init__(self, crt, current_tab)
         self.line_matches = ["\r\n", '\r', '\n', '--More--']
+        self.terminal_profile = {
+            "show": "show terminal",
+            "apply": ["terminal length 0"],
+            "restore": [(r"Length: (\d+)", "terminal length {}")]
+        }
+        # No way to show part of the configuration, get_config_sections() parses the whole thing.
+        self.section_commands = {}
+        self.change_marker_commands = {}
 
     def __str__(self):
         return '<Class: WAAS>'
\ No newline at end of file
@@ -18,4 +18,6 @@ class XE(CiscoRunner):
         :return:
             Hostname set in running-config of Cisco device
         """
-        return self.get_command_output("sh run | i hostname")[0].split("hostname ")[1]
+        if not self.hostname:
+            self.hostname = self.get_command_output("sh run | i hostname")[0].split("hostname ")[1]
+        return self.hostname
@@ -1,14 +1,52 @@
 # $language = "Python3"
 # $interface = "1.0"
 
+import logging
 from runners.cisco.cisco_runner import CiscoRunner
 
+logger = logging.getLogger()
+
+# XR has no User EXEC mode. Leaving configuration mode with uncommitted changes asks whether to commit them.
+xr_mode_transitions = {
+    "Privileged EXEC": {"Global Configuration": "configure terminal"},
+    "Global Configuration": {"Privileged EXEC": "end",
+                             "Interface": "interface {interface}"},
+    "Interface": {"Privileged EXEC": "end",
+                  "Global Configuration": "exit",
+                  "Interface": "interface {interface}"},
+    "Routing Engine": {"Privileged EXEC": "end",
+                       "Global Configuration": "exit",
+                       "Interface": "interface {interface}"},
+    "Line": {"Privileged EXEC": "end",
+             "Global Configuration": "exit"},
+    "Configuration Submode": {"Privileged EXEC": "end",
+                              "Global Configuration": "exit",
+                              "Interface": "interface {interface}"}
+}
+
+
+# XR takes the section to show as an argument of "show running-config".
+xr_section_commands = {
+    "interface": ("show running-config interface", "show running-config interface {name}"),
+    "router": ("show running-config router", "show running-config router {name}"),
+    "vrf": ("show running-config vrf", "show running-config vrf {name}"),
+    "line": ("show running-config line", None),
+    "acl": ("show running-config ipv4 access-list", "show running-config ipv4 access-list {name}")
+}
+
+# Every change on XR is a commit, so the newest commit ID marks the configuration. XR has no startup-config.
+xr_change_marker_commands = {
+    "running": ("show configuration commit list 1", r"^\s*1\s+\d+")
+}
+
 
 class XR(CiscoRunner):
     def __init__(self, crt, current_tab):
         CiscoRunner.__init__(self, crt, current_tab)
-        # TODO: create line matches for the XR class!
-        self.line_matches = None
+        self.line_matches = ["\r\n", '\r', '\n', '--More--']
+        self.mode_transitions = xr_mode_transitions
+        self.section_commands = xr_section_commands
+        self.change_marker_commands = xr_change_marker_commands
 
     def __str__(self):
         return '<Class: XR>'
@@ -17,7 +55,43 @@ class XR(CiscoRunner):
         self.global_config()
         self.send("cdp \r")
 
-    def enable_cdp_intf(self, interface):
-        self.goto_intf_config(interface)
-        self.send("cdp \r")
-        self.send("no shut \r")
\ No newline at end of file
+    def get_cdp_intf_commands(self):
+        return ["cdp", "no shut"]
+
+    def goto_mode(self, target_mode, interface=None):
+        """
+        Same as CiscoRunner.goto_mode(), but commits changes before leaving configuration mode. Otherwise XR asks
+        whether to commit them, and the mode change gets stuck on that question.
+        """
+        if self.unsaved_changes and self.mode_prompt and "(config" in self.mode_prompt and \
+                target_mode == "Privileged EXEC":
+            self.save_changes()
+        return CiscoRunner.goto_mode(self, target_mode, interface)
+
+    def has_unsaved_changes(self):
+        """
+        XR saves every commit, so only changes that weren't committed yet need saving. Those are only there while
+        the device is in configuration mode, and "show configuration" lists them.
+        :return: True or False
+        """
+        if not self.mode_prompt or "(config" not in self.mode_prompt:
+            return False
+        for line in self.get_command_output("show configuration", cache=False):
+            line = line.strip()
+            if line and not line.startswith("!!") and line not in ("end", "Building configuration..."):
+                return True
+        return False
+
+    def write_config(self):
+        """
+        Sends "commit" for the changes made in configuration mode. Use save_changes() to only commit when something
+        changed.
+        """
+        if not self.mode_prompt or "(config" not in self.mode_prompt:
+            return
+        output = self.get_command_output("commit", cache=False)
+        errors = [line.strip() for line in output if "% Failed" in line or "% Invalid" in line]
+        if errors:
+            logger.warning("<write_config> Commit failed: {}".format(" / ".join(errors)))
+            if self.skip_exceptions is False:
+                raise Exception("Commit failed: {}".format(" / ".join(errors)))
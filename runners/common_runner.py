@@ -3,6 +3,7 @@
 
 import os
 import re
+import time
 import logging
 from logging.config import fileConfig
 
@@ -20,6 +21,9 @@ logger.addHandler(handler)
 logger.addHandler(file_handler)
 logger.setLevel(logging.DEBUG)
 
+# RegEx to match the whitespace and backspace commands after --More-- prompt
+more_regex = re.compile(r' [\b]+[ ]+[\b]+(?P<line>.*)')
+
 
 class CommonRunner:
     """
@@ -28,6 +32,12 @@ class CommonRunner:
 
     :param self.read_until:
         Used for the self.send_command function to differentiate user input from command output.
+    :param self.capture_mode:
+        How get_command_output() reads output. "bulk" reads whatever output arrives in self.read_slice milliseconds
+        with each ReadString() call and splits the lines in Python. "line" calls ReadString() once per line.
+    :param self.read_slice:
+        The longest time in milliseconds a "bulk" ReadString() call waits, which bounds how much output is read at
+        once. self.response_timeout is the longest time without any output, not the time for the whole output.
     """
 
     def __init__(self, crt, current_tab=None):
@@ -46,6 +56,8 @@ class CommonRunner:
         self.hostname = None
         self.read_until = "#"
         self.line_matches = ["\r\n", '\r', '\n', '--More--']
+        self.capture_mode = "bulk"
+        self.read_slice = 200
 
     def __str__(self):
         return '<Class: CommonRunner>'
@@ -194,65 +206,154 @@ class CommonRunner:
         """
 
         timeout = self.response_timeout
-        skip_exceptions = self.skip_exceptions
-
-        # RegEx to match the whitespace and backspace commands after --More-- prompt
-        exp_more = r' [\b]+[ ]+[\b]+(?P<line>.*)'
-        re_more = re.compile(exp_more)
 
         self.set_prompt()
-        line_matches = [self.prompt] + self.line_matches
 
         output = []
-        # Write the output to the specified file
         try:
-            # Need the 'b' in mode 'wb', or else Windows systems add extra blank lines.
             self.send(command + "\r")
             logger.info("Command '{}' sent to device/tab.".format(command))
-
-            # Loop to capture every line of the command.  If we get CRLF (first entry in our "endings" list), then
-            # write that line to the file.  If we get our prompt back (which won't have CRLF), break the loop b/c we
-            # found the end of the output.
-            while True:
-                nextline = self.current_tab.Screen.ReadString(line_matches, timeout)
-                # If the match was the 1st index in the endings list -> \r\n
-                if self.current_tab.Screen.MatchIndex == 0:
-                    logger.debug("MatchIndex is 0. Timeout trying to capture input.")
-                    # TODO: debugging/logging if this scope is reached
-                    # TODO: gets stuck here on commands that show the next prompt with no output
-                    if self.skip_exceptions is False:
-                        raise Exception("Timeout trying to capture output")
-                elif self.current_tab.Screen.MatchIndex == 1:
-                    logger.debug("MatchIndex is 1. Successfully found prompt!")
-                    # We got our prompt, so break the loop
-                    break
-                elif self.current_tab.Screen.MatchIndex <= 4:
-                    # Strip newlines from front and back of line.
-                    nextline = nextline.strip('\r\n')
-                    # If there is something left, write it.
-                    if nextline != "":
-                        # Check for backspace and spaces after --More-- prompt and strip them out if needed.
-                        regex = re_more.match(nextline)
-                        if regex:
-                            nextline = regex.group('line')
-                        # Strip line endings from line.  Also re-encode line as ASCII
-                        # and ignore the character if it can't be done (rare error on
-                        # Nexus)
-                        output.append(nextline.strip('\r\n'))
-                    logger.debug("MatchIndex is less than or equal to 4. Append newline to output list.")
-                elif self.current_tab.Screen.MatchIndex > 4:
-                    # If we get a --More-- send a space character
-                    self.crt_send(" ")
-                    logger.debug("MatchIndex is greater than 4. Usually this means we encountered a 'More' prompt.")
-                else:
-                    if self.skip_exceptions is False:
-                        raise Exception("Timeout trying to capture output")
+            output, found_prompt = self.read_until_prompt(timeout)
+            if not found_prompt and self.skip_exceptions is False:
+                raise Exception("Timeout trying to capture output")
         except Exception as e:
             if self.skip_exceptions is False:
                 self.crt.Dialog.MessageBox(str(e))
             logger.debug(e)
         return output
 
+    def get_pager_matches(self):
+        """
+        Returns the pager prompts from self.line_matches, like '--More--', leaving out the line endings.
+        :return: list of pager prompt strings
+        """
+        return [match for match in self.line_matches or [] if match not in ("\r\n", "\r", "\n")]
+
+    def split_output(self, chunk):
+        """
+        Splits a chunk of raw shell output into lines, the same way "line" capture mode does:
+        line endings are stripped, empty lines are dropped, and the backspaces left by a pager are removed.
+        :param chunk: raw output read from the screen
+        :return: generator of lines
+        """
+        for line in re.finditer(r"[^\r\n]+", chunk):
+            line = line.group()
+            # Check for backspace and spaces after --More-- prompt and strip them out if needed.
+            regex = more_regex.match(line)
+            if regex:
+                line = regex.group('line')
+            yield line
+
+    def iter_chunks_until_prompt(self, timeout):
+        """
+        Generator for "bulk" capture mode. Reads output in chunks, up to self.prompt or a pager prompt like '--More--',
+        instead of one ReadString() call per line. Pager prompts are answered with a space.
+        Each ReadString() call waits at most self.read_slice milliseconds, so a chunk is the output that arrived in that
+        time, and a long output keeps being read as long as it keeps arriving.
+        :param timeout: time in seconds to wait without receiving any output
+        :return: yields output lines, and returns whether the prompt was found before timing out
+        """
+        pager_matches = self.get_pager_matches()
+        read_matches = [self.prompt] + pager_matches
+        line_count = 0
+        # The unfinished line at the end of the last chunk
+        partial = ""
+        last_output = time.monotonic()
+        while True:
+            received = self.current_tab.Screen.ReadString(read_matches, self.read_slice, True)
+            match_index = self.current_tab.Screen.MatchIndex
+            if received:
+                last_output = time.monotonic()
+            chunk = partial + received
+            line_end = max(chunk.rfind("\n"), chunk.rfind("\r")) + 1
+            partial = chunk[line_end:]
+            chunk = chunk[:line_end]
+            if match_index == 0 and partial:
+                # The prompt or pager prompt can arrive across two reads, and then neither read matches it
+                if partial.endswith(self.prompt):
+                    match_index = 1
+                else:
+                    for index, pager_match in enumerate(pager_matches):
+                        if pager_match in partial:
+                            match_index = index + 2
+                            break
+            for line in self.split_output(chunk):
+                line_count += 1
+                yield line
+            if match_index == 0:
+                if time.monotonic() - last_output < timeout:
+                    continue
+                logger.debug("<iter_chunks_until_prompt> Timeout trying to capture output.")
+                return False
+            # Leave out the partial line in front of the prompt or pager prompt, like "line" mode does.
+            partial = ""
+            if match_index == 1:
+                logger.debug("<iter_chunks_until_prompt> Found prompt after {} lines.".format(line_count))
+                return True
+            # We got a pager prompt, send a space character for the next page
+            self.current_tab.Screen.Send(" ")
+
+    def iter_lines_until_prompt(self, timeout):
+        """
+        Generator for "line" capture mode. Reads output with one ReadString() call per line until self.prompt shows.
+        :param timeout: time in seconds to wait for each line
+        :return: yields output lines, and returns whether the prompt was found before timing out
+        """
+        line_matches = [self.prompt] + self.line_matches
+
+        # Loop to capture every line of the command.  If we get CRLF (first entry in our "endings" list), then
+        # yield that line.  If we get our prompt back (which won't have CRLF), break the loop b/c we
+        # found the end of the output.
+        while True:
+            nextline = self.current_tab.Screen.ReadString(line_matches, timeout)
+            if self.current_tab.Screen.MatchIndex == 0:
+                logger.debug("MatchIndex is 0. Timeout trying to capture input.")
+                return False
+            elif self.current_tab.Screen.MatchIndex == 1:
+                logger.debug("MatchIndex is 1. Successfully found prompt!")
+                # We got our prompt, so break the loop
+                return True
+            elif self.current_tab.Screen.MatchIndex <= 4:
+                # Strip newlines from front and back of line.
+                nextline = nextline.strip('\r\n')
+                # If there is something left, yield it.
+                if nextline != "":
+                    # Check for backspace and spaces after --More-- prompt and strip them out if needed.
+                    regex = more_regex.match(nextline)
+                    if regex:
+                        nextline = regex.group('line')
+                    yield nextline
+            else:
+                # If we get a --More-- send a space character
+                self.current_tab.Screen.Send(" ")
+                logger.debug("MatchIndex is greater than 4. Usually this means we encountered a 'More' prompt.")
+
+    def iter_until_prompt(self, timeout=None):
+        """
+        Yields lines of command output until self.prompt shows, using self.capture_mode.
+        :param timeout: time in seconds to wait for output
+        :return: yields output lines, and returns whether the prompt was found before timing out
+        """
+        if timeout is None:
+            timeout = self.response_timeout
+        if self.capture_mode == "bulk":
+            return (yield from self.iter_chunks_until_prompt(timeout))
+        return (yield from self.iter_lines_until_prompt(timeout))
+
+    def read_until_prompt(self, timeout=None):
+        """
+        Reads command output until self.prompt shows, using self.capture_mode.
+        :param timeout: time in seconds to wait for output
+        :return: a tuple of the output lines and whether the prompt was found before timing out
+        """
+        output = []
+        lines = self.iter_until_prompt(timeout)
+        while True:
+            try:
+                output.append(next(lines))
+            except StopIteration as stop:
+                return output, stop.value
+
     def send_spacebar(self):
         """
         Send a spacebar to SecureCRT. Useful for --More-- prompts.
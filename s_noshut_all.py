@@ -21,7 +21,6 @@ else:
 # Local import
 import runners
 from crt_automation.sessions import CrtSession
-from crt_automation.utilities import expand_int_range
 
 # Main function and script logic here:
 def main():
@@ -49,25 +48,18 @@ def main():
     # All interfaces
     if not int_ranges:
         interfaces = nos.get_intf_names()
-        nos.set_prompt()
-        nos.global_config()
-        for intf_obj in interfaces:
-            nos.send("int {} \r".format(intf_obj))
-            nos.send("no shut \r")
-            if input_commands is not None:
-                for command in input_commands.split(","):
-                    nos.send("{} \r".format(command))
     else:  # Interface ranges
-        for range in int_ranges:
-            nos.set_prompt()
-            nos.global_config()
-            int_list = expand_int_range(range)
-            for int in int_list:
-                nos.send("int {} \r".format(int))
-                nos.send("no shut \r")
-                if input_commands is not None:
-                    for command in input_commands.split(","):
-                        nos.send("{} \r".format(command))
+        interfaces = []
+        for int_range in int_ranges:
+            interfaces += nos.expand_intf_range(int_range)
+
+    commands = ["no shut"]
+    if input_commands is not None:
+        commands += input_commands.split(",")
+
+    # Sent as a few "interface range" commands instead of one block per interface
+    nos.global_config()
+    nos.configure_interfaces(interfaces, commands)
 
     nos.priv_exec()
     nos.set_prompt()
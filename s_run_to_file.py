@@ -20,6 +20,8 @@ else:
 # Local import
 import runners
 from crt_automation.sessions import CrtSession
+from crt_automation.config_archive import ConfigArchive
+from crt_automation.config_search import ConfigIndex
 
 
 # Main function and script logic here:
@@ -38,7 +40,16 @@ def main():
     # Avoid "boilerplate" nastiness by using prebuilt functions to enter configuration modes:
     net_os.priv_exec()
 
-    net_os.write_output_to_file("show running-config", "running-config.txt")
+    # Each version is archived once, and only fetched if the configuration changed since the last backup
+    # The search index is updated with each new version, see s_search_configs.py
+    archive = ConfigArchive(search_index=ConfigIndex())
+    version, new = net_os.archive_config(archive, "running")
+    if version is None:
+        scrt.message_box("Timed out reading the running-config, nothing was archived.")
+        return net_os
+    # The latest version, for reading or copying somewhere else
+    with open(os.path.join(script_dir, "running-config.txt"), "w") as config_file:
+        config_file.writelines(line + "\n" for line in archive.get(net_os.get_archive_name("running"), version))
 
     return net_os  # return OS class so we can run commands on it from other common_tasks, and see gathered information.
 
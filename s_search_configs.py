@@ -0,0 +1,57 @@
+# $language = "Python3"
+# $interface = "1.0"
+
+import os
+import sys
+
+# Avoids errors in IDE's that can't detect the crt variable:
+global crt
+
+# Adds script directory to PYTHONPATH,
+# so we can import local modules when running common_tasks from SecureCRT
+script_dir = None
+if 'crt' in globals():
+    script_dir, script_name = os.path.split(crt.ScriptFullName)
+if script_dir not in sys.path:
+    sys.path.append(script_dir)
+else:
+    script_dir, script_name = os.path.split(os.path.realpath(__file__))
+
+# Local import
+from crt_automation.sessions import CrtSession
+from crt_automation.config_search import ConfigIndex
+
+
+# Main function and script logic here:
+def main():
+    scrt = CrtSession(crt)
+    # Searches the configurations archived by s_run_to_file.py and s_start_to_file.py, without connecting to anything
+    query = scrt.prompt("Text to find in the archived configurations.\nStart with re: for a regular expression.")
+    if not query:
+        return
+
+    index = ConfigIndex()
+    try:
+        if query.startswith("re:"):
+            results = index.search(regex=query[3:])
+        else:
+            results = index.search(query)
+    finally:
+        index.close()
+
+    if not results:
+        scrt.message_box("No archived configuration matches '{}'".format(query))
+        return
+    lines = ["{} line {}: {}".format(device, line_number, line.strip())
+             for device, kind, version, line_number, line in results]
+    devices = set(result[0] for result in results)
+    # Message boxes don't scroll, so long results are saved to a file as well
+    with open(os.path.join(script_dir, "search-results.txt"), "w") as results_file:
+        results_file.write("\n".join(lines) + "\n")
+    message = "{} lines on {} devices:\n".format(len(lines), len(devices)) + "\n".join(lines[:30])
+    if len(lines) > 30:
+        message += "\n... all results are in search-results.txt"
+    scrt.message_box(message)
+
+
+main()
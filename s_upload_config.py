@@ -51,23 +51,37 @@ def main():
 
     image_full_path = crt.Dialog.FileOpenDialog(title="Please select a Cisco configuration text file to upload.")
 
-    config_file = open(image_full_path, "r")
+    with open(image_full_path, "r") as config_file:
+        config_lines = [line.rstrip() for line in config_file]
 
-    running_config = []
-    for line in config_file:
-        stripped_line = line.strip()
-        line_list = stripped_line.split()
-        running_config.append(line_list)
-    config_file.close()
-
-    runner.global_config()
-    for line in running_config:
-        runner.send("{} \r".format(line))
+    # Removing lines is opt-in, since a file is often only part of the configuration. IDYES is 6
+    remove = crt.Dialog.MessageBox("Also remove the lines of the changed sections that the file doesn't have?",
+                                   "Upload configuration", 4) == 6
+    # Only the lines that aren't on the device yet are sent
+    delta, errors = runner.push_config(config_lines, dry_run=True, remove=remove)
+    if not delta.lines:
+        crt.Dialog.MessageBox(delta.report())
+        return
+    # IDYES is 6
+    if crt.Dialog.MessageBox(delta.report() + "\n\nSend these lines?", "Upload configuration", 4) != 6:
+        return
+    if len(delta.lines) > 200:
+        # Large changes are much faster to copy from a TFTP server on this computer than to type
+        errors = []
+        if not runner.upload_config(delta.lines):
+            crt.Dialog.MessageBox("The device couldn't copy the configuration, see the log for details.")
+    else:
+        runner.global_config()
+        errors = runner.send_config_lines(delta.lines)
 
     runner.priv_exec()
 
     runner.save_changes()
 
+    if errors:
+        crt.Dialog.MessageBox("The device rejected these lines:\n" +
+                              "\n".join("Line {}: {} ({})".format(*error) for error in errors))
+
     return
 
 
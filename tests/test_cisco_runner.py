@@ -0,0 +1,81 @@
+# Tests for runners.cisco.cisco_runner. Run from the project's root directory: python -m unittest discover tests
+
+import os
+import sys
+import logging
+import unittest
+
+project_dir = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+sys.path.insert(0, project_dir)
+sys.path.insert(0, os.path.join(project_dir, "benchmarks"))
+
+from fake_crt import FakeScreen, FakeCrt
+
+from runners.cisco.cisco_runner import CiscoRunner
+from runners.cisco.nxos_runner import NXOS
+
+
+def make_runner(runner_class):
+    """
+    Returns a runner without a SecureCRT tab, whose send_config_lines() only records the lines and accepts them.
+    """
+    runner = object.__new__(runner_class)
+    runner.mode = "Global"
+    runner.sent = []
+
+    def send_config_lines(lines):
+        runner.sent.append(list(lines))
+        if lines[0].startswith("interface"):
+            runner.mode = "Interface"
+        elif lines[-1] == "exit":
+            runner.mode = "Global"
+        return []
+    runner.send_config_lines = send_config_lines
+    return runner
+
+
+class ConfigureInterfacesTest(unittest.TestCase):
+    def setUp(self):
+        logging.disable(logging.CRITICAL)
+
+    def tearDown(self):
+        logging.disable(logging.NOTSET)
+
+    def test_nxos_range_command(self):
+        runner = make_runner(NXOS)
+        interfaces = ["Ethernet1/{}".format(number) for number in range(1, 33)] + ["Ethernet1/40"]
+        self.assertEqual(runner.configure_interfaces(interfaces, ["cdp enable"]), [])
+        self.assertEqual(runner.sent, [["interface Eth1/1-32, Eth1/40"], ["cdp enable", "exit"]])
+
+    def test_ios_range_command(self):
+        runner = make_runner(CiscoRunner)
+        interfaces = ["GigabitEthernet1/0/{}".format(number) for number in range(1, 5)]
+        self.assertEqual(runner.configure_interfaces(interfaces, ["cdp enable"]), [])
+        self.assertEqual(runner.sent, [["interface range Gi1/0/1 - 4"], ["cdp enable", "exit"]])
+
+
+class UnsavedChangesTest(unittest.TestCase):
+    def setUp(self):
+        logging.disable(logging.CRITICAL)
+        crt = FakeCrt([FakeScreen("r1")])
+        self.runner = CiscoRunner(crt, crt.GetScriptTab())
+
+    def tearDown(self):
+        logging.disable(logging.NOTSET)
+
+    def test_moving_between_modes_is_not_a_change(self):
+        self.runner.goto_intf_config("Gi1/0/1")
+        self.assertEqual(self.runner.mode, "Interface")
+        self.runner.priv_exec()
+        self.assertFalse(self.runner.unsaved_changes)
+
+    def test_config_changes(self):
+        for command in ("interface range Gi1/0/1 - 4", "line vty 0 4", "exit", "end", "do show ip int brief"):
+            self.assertFalse(self.runner.is_config_change(command), command)
+        # Entering a virtual interface or a router section can create it
+        for command in ("description uplink", "interface Loopback5", "interface Vlan10", "router ospf 1"):
+            self.assertTrue(self.runner.is_config_change(command), command)
+
+
+if __name__ == '__main__':
+    unittest.main()
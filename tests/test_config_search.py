@@ -0,0 +1,41 @@
+# Tests for crt_automation.config_search. Run from the project's root directory: python -m unittest discover tests
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+from crt_automation.config_search import ConfigIndex, required_literals
+
+
+class RequiredLiteralsTest(unittest.TestCase):
+    def test_literals_around_a_pattern(self):
+        self.assertEqual(required_literals(r"ip helper-address 10\.1\.\d+\.1"), ["ip helper-address 10.1.", ".1"])
+
+    def test_scoped_ignore_case_group_is_skipped(self):
+        self.assertEqual(required_literals(r"(?i:HOSTNAME) x"), [" x"])
+
+
+class ConfigIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.index = ConfigIndex(os.path.join(self.directory, "index.db"))
+        self.index.add("router1", ["hostname x", "interface Gi0/1"], version="1")
+
+    def tearDown(self):
+        self.index.close()
+        shutil.rmtree(self.directory)
+
+    def test_scoped_ignore_case_group_matches_any_case(self):
+        results = self.index.search(regex=r"(?i:HOSTNAME) x")
+        self.assertEqual([(result[0], result[4]) for result in results], [("router1", "hostname x")])
+
+    def test_case_sensitive_literal_still_filters(self):
+        self.assertEqual(self.index.search(regex=r"(?i:hostname) X"), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
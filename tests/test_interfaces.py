@@ -0,0 +1,31 @@
+# Tests for crt_automation.interfaces. Run from the project's root directory: python -m unittest discover tests
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+from crt_automation.interfaces import InterfaceExtractor
+
+
+class InterfaceExtractorTest(unittest.TestCase):
+    def setUp(self):
+        self.extractor = InterfaceExtractor()
+
+    def test_words_before_spaced_numbers_are_not_interfaces(self):
+        for text in ("Internal 1/2", "Port 1/1", "Group 1/2", "In 1/2", "change at 14:02:13"):
+            self.assertEqual(self.extractor.extract(text), {}, text)
+
+    def test_spaced_abbreviations_and_long_names(self):
+        found = self.extractor.extract("Gig 1/0/1 Eth 1/2 GigabitEthernet 1/0/3")
+        self.assertEqual(list(found), ["GigabitEthernet1/0/1", "Ethernet1/2", "GigabitEthernet1/0/3"])
+
+    def test_prefixes_without_a_space(self):
+        found = self.extractor.extract("Fa0/1 Gi1/0/2 Port-channel10 Internal-Data0/1")
+        self.assertEqual(list(found), ["FastEthernet0/1", "GigabitEthernet1/0/2", "Port-channel10",
+                                       "Internal-Data0/1"])
+
+
+if __name__ == '__main__':
+    unittest.main()